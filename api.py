@@ -4,21 +4,41 @@ from __future__ import annotations
 import json
 import logging
 import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 
 from pydantic import BaseModel
 
-from evidence.pipeline import build_evidence_bundle
+from evidence.config import EVIDENCE_CACHE_MODE, SPECULATIVE_SEARCH
+from evidence.merkle import MERKLE_VERSIONS, MerkleTree, bundle_leaves, cached_tree, remember_tree
+from evidence.pipeline import build_evidence_bundle, stream_evidence_bundle
 from swarm.mock_evidence import MOCK_BUNDLES
-from swarm.runner import run_swarm, stream_swarm
-from swarm.schemas import EvidenceBundle, VerdictDistribution
+from swarm.models import close_registry, get_registry
+from swarm.runner import stream_swarm
+from swarm.coalesce import RunCoalescer, run_key
+from swarm.jobs import Job, JobManager, QueueFullError, Runner
+from swarm.schemas import EvidenceBundle, JobInfo, MerkleProof, VerdictDistribution
+from swarm.stopping import StoppingPolicy, make_stopping_policy
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Veritas Swarm API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the shared LLM clients and start the job workers; stop both on shutdown."""
+    if os.environ.get("OPENAI_API_KEY"):
+        get_registry().get()
+    app.state.jobs = JobManager(JOB_RUNNERS)
+    await app.state.jobs.start()
+    yield
+    await app.state.jobs.stop()
+    await close_registry()
+
+
+app = FastAPI(title="Veritas Swarm API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,37 +48,82 @@ app.add_middleware(
 )
 
 
+def _stopping_policy(name: str | None) -> StoppingPolicy:
+    """Resolve the `?stopping=` query parameter, rejecting unknown policy names."""
+    try:
+        return make_stopping_policy(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.post("/evaluate", response_model=VerdictDistribution)
-async def evaluate(bundle: EvidenceBundle) -> VerdictDistribution:
+async def evaluate(bundle: EvidenceBundle, stopping: str | None = None) -> VerdictDistribution:
     """Run the swarm and return the final verdict distribution."""
-    return await run_swarm(bundle)
+    _stopping_policy(stopping)
+    async for event, data in _coalesced_swarm_events(bundle, stopping, post_onchain=False):
+        if event == "verdict":
+            return VerdictDistribution(**data)
+    raise HTTPException(status_code=500, detail="Swarm run ended without a verdict")
 
 
-@app.post("/evaluate/stream")
-async def evaluate_stream(bundle: EvidenceBundle) -> StreamingResponse:
-    """Stream convergence snapshots as SSE, then the final verdict."""
+def _sse(event: str, data: dict, event_id: int | None = None) -> str:
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(data)}\n\n"
 
-    async def event_generator():
-        async for item in stream_swarm(bundle):
-            if isinstance(item, VerdictDistribution):
-                # Post on-chain if configured
-                onchain_result = None
-                if os.environ.get("CONTRACT_ADDRESS"):
-                    try:
-                        from swarm.onchain import post_verdict
-                        onchain_result = post_verdict(bundle.question, bundle.merkle_root, item)
-                    except Exception:
-                        logger.exception("Failed to post verdict on-chain")
-
-                verdict_data = item.model_dump()
-                if onchain_result:
-                    verdict_data["onchain"] = onchain_result
-
-                yield f"event: verdict\ndata: {json.dumps(verdict_data)}\n\n"
-            else:
-                yield f"event: snapshot\ndata: {json.dumps(item.model_dump())}\n\n"
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+async def _sse_stream(events: AsyncIterator[tuple[str, dict]]) -> AsyncIterator[str]:
+    async for event, data in events:
+        yield _sse(event, data)
+
+
+async def _swarm_events(
+    bundle: EvidenceBundle,
+    policy: StoppingPolicy,
+    post_onchain: bool = True,
+) -> AsyncIterator[tuple[str, dict]]:
+    """Snapshots per iteration, then the verdict (posted on-chain if configured)."""
+    async for item in stream_swarm(bundle, stopping=policy):
+        if isinstance(item, VerdictDistribution):
+            # Post on-chain if configured
+            onchain_result = None
+            if post_onchain and os.environ.get("CONTRACT_ADDRESS"):
+                try:
+                    from swarm.onchain import post_verdict
+                    onchain_result = post_verdict(bundle.question, bundle.merkle_root, item)
+                except Exception:
+                    logger.exception("Failed to post verdict on-chain")
+
+            verdict_data = item.model_dump()
+            if onchain_result:
+                verdict_data["onchain"] = onchain_result
+
+            yield "verdict", verdict_data
+        else:
+            yield "snapshot", item.model_dump()
+
+
+_runs = RunCoalescer()
+
+
+def _coalesced_swarm_events(
+    bundle: EvidenceBundle,
+    stopping: str | None,
+    post_onchain: bool = True,
+) -> AsyncIterator[tuple[str, dict]]:
+    """`_swarm_events`, shared with identical concurrent requests and cached once finished.
+
+    Only the run's leader posts on-chain; subscribers and cache hits see its result.
+    """
+    key = run_key(bundle, stopping=stopping, post_onchain=post_onchain)
+    return _runs.stream(key, lambda: _swarm_events(bundle, make_stopping_policy(stopping), post_onchain))
+
+
+@app.post("/evaluate/stream")
+async def evaluate_stream(bundle: EvidenceBundle, stopping: str | None = None) -> StreamingResponse:
+    """Stream convergence snapshots as SSE, then the final verdict."""
+    _stopping_policy(stopping)
+    events = _coalesced_swarm_events(bundle, stopping)
+    return StreamingResponse(_sse_stream(events), media_type="text/event-stream")
 
 
 @app.get("/mock-bundles")
@@ -69,12 +134,188 @@ async def get_mock_bundles() -> list[EvidenceBundle]:
 
 class QuestionRequest(BaseModel):
     question: str
+    use_cache: bool = False       # read and write the planner/search cache (results up to SEARCH_CACHE_TTL_S old)
+    bypass_cache: bool = False    # neither read nor write the planner/search cache
+    refresh_cache: bool = False   # ignore cached plans and results, store fresh ones
+
+    def cache_mode(self) -> str:
+        if self.bypass_cache:
+            return "bypass"
+        if self.refresh_cache:
+            return "refresh"
+        return "use" if self.use_cache else EVIDENCE_CACHE_MODE
 
 
 @app.post("/collect-evidence", response_model=EvidenceBundle)
 async def collect_evidence(req: QuestionRequest) -> EvidenceBundle:
     """Run the evidence pipeline: question → search → score → hash → EvidenceBundle."""
-    return await build_evidence_bundle(req.question)
+    return await build_evidence_bundle(req.question, cache=req.cache_mode())
+
+
+async def _resolve_events(question: str, cache: str, stopping: str | None) -> AsyncIterator[tuple[str, dict]]:
+    """Evidence pipeline stage events, the committed bundle, then the swarm's events."""
+    bundle = None
+    try:
+        async for item in stream_evidence_bundle(question, cache=cache, speculative_search=SPECULATIVE_SEARCH):
+            if isinstance(item, EvidenceBundle):
+                bundle = item
+                yield "bundle", item.model_dump()
+            else:
+                yield item.stage, item.data
+    except Exception as e:
+        logger.exception("Evidence pipeline failed for %r", question)
+        yield "error", {"stage": "evidence", "detail": str(e)}
+        return
+    async for event in _coalesced_swarm_events(bundle, stopping):
+        yield event
+
+
+@app.post("/resolve/stream")
+async def resolve_stream(req: QuestionRequest, stopping: str | None = None) -> StreamingResponse:
+    """Question → verdict in one call, streamed as SSE.
+
+    Events: `plan`, one `search` per query as it finishes, `bundle` once the
+    evidence is committed, then the swarm's `snapshot`s and `verdict`.
+    Unless the plan is cached, the question itself is searched while the
+    planner runs (`SPECULATIVE_SEARCH`). A pipeline failure ends the stream
+    with an `error` event.
+    """
+    _stopping_policy(stopping)
+    events = _resolve_events(req.question, req.cache_mode(), stopping)
+    return StreamingResponse(_sse_stream(events), media_type="text/event-stream")
+
+
+# ── Jobs ────────────────────────────────────────────────────────────
+
+JOB_RUNNERS: dict[str, Runner] = {
+    "evaluate": lambda req: _coalesced_swarm_events(EvidenceBundle(**req["bundle"]), req["stopping"]),
+    "resolve": lambda req: _resolve_events(req["question"], req["cache"], req["stopping"]),
+}
+
+
+class JobRequest(QuestionRequest):
+    question: str | None = None
+    bundle: EvidenceBundle | None = None    # evaluate this bundle instead of resolving a question
+    stopping: str | None = None
+
+
+def _jobs() -> JobManager:
+    return app.state.jobs
+
+
+def _job(job_id: str) -> Job:
+    job = _jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job
+
+
+@app.post("/jobs", response_model=JobInfo, status_code=202)
+async def submit_job(req: JobRequest) -> JobInfo:
+    """Queue a swarm run for a bundle or a question; poll, stream or cancel it by id."""
+    _stopping_policy(req.stopping)
+    if (req.bundle is None) == (req.question is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of question or bundle")
+    if req.bundle is not None:
+        kind, request = "evaluate", {"bundle": req.bundle.model_dump(), "stopping": req.stopping}
+    else:
+        kind, request = "resolve", {"question": req.question, "cache": req.cache_mode(), "stopping": req.stopping}
+    try:
+        job = _jobs().submit(kind, request)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    return job.info(_jobs().position(job))
+
+
+@app.get("/jobs/metrics")
+async def job_metrics() -> dict:
+    """Worker pool and queue depth, plus how many swarm runs were shared or served from cache."""
+    return {**_jobs().metrics(), "coalescing": _runs.stats()}
+
+
+@app.get("/jobs/{job_id}", response_model=JobInfo)
+async def get_job(job_id: str) -> JobInfo:
+    job = _job(job_id)
+    return job.info(_jobs().position(job))
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str) -> dict:
+    """The verdict of a succeeded job; 409 while it is unfinished or if it failed."""
+    job = _job(job_id)
+    if job.result is None:
+        raise HTTPException(status_code=409, detail={"status": job.status, "error": job.error})
+    return job.result
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, after: int = 0, last_event_id: str | None = Header(None)) -> StreamingResponse:
+    """Replay a job's events as SSE and follow it until it finishes.
+
+    Reattach after a dropped connection with `?after=<last id>`; browsers'
+    EventSource does this itself through the `Last-Event-ID` header.
+    """
+    _job(job_id)
+    if last_event_id is not None and last_event_id.isdigit():
+        after = max(after, int(last_event_id))
+
+    async def event_generator():
+        async for seq, event, data in _jobs().events(job_id, after):
+            yield _sse(event, data, seq)
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+
+@app.post("/jobs/{job_id}/cancel", response_model=JobInfo)
+async def cancel_job(job_id: str) -> JobInfo:
+    """Cancel a queued job at once, or a running one at its next await (poll for `cancelled`)."""
+    _job(job_id)
+    return _jobs().cancel(job_id).info()
+
+
+class ProofRequest(BaseModel):
+    evidence_id: int
+    merkle_root: str | None = None       # a bundle built by this server
+    bundle: EvidenceBundle | None = None  # or any bundle, rehashed once and then cached
+
+
+@app.post("/merkle/proof", response_model=MerkleProof)
+async def merkle_proof(req: ProofRequest) -> MerkleProof:
+    """Inclusion proof of one evidence item, checkable against the on-chain root in a few hashes."""
+    root = req.bundle.merkle_root if req.bundle is not None else req.merkle_root
+    if root is None:
+        raise HTTPException(status_code=400, detail="Provide merkle_root or bundle")
+    tree = cached_tree(root)
+    if tree is None:
+        if req.bundle is None:
+            raise HTTPException(status_code=404, detail=f"Unknown merkle_root {root}; send the bundle")
+        version = req.bundle.merkle_version
+        if version not in MERKLE_VERSIONS:
+            raise HTTPException(status_code=422, detail=f"Unknown merkle_version {version}")
+        leaves = bundle_leaves(req.bundle.question, [e.model_dump() for e in req.bundle.evidence], version)
+        tree = MerkleTree(leaves, version)
+        if tree.root != root:
+            raise HTTPException(status_code=422, detail="Bundle does not hash to its merkle_root")
+        remember_tree(tree)
+
+    ids = [e.id for e in req.bundle.evidence] if req.bundle is not None else None
+    if ids is not None:
+        if req.evidence_id not in ids:
+            raise HTTPException(status_code=404, detail=f"No evidence item {req.evidence_id}")
+        index = ids.index(req.evidence_id) + 1
+    else:
+        index = req.evidence_id  # pipeline bundles number evidence 1..n after the question leaf
+        if not 1 <= index < len(tree):
+            raise HTTPException(status_code=404, detail=f"No evidence item {req.evidence_id}")
+    return MerkleProof(
+        merkle_root=root,
+        merkle_version=tree.version,
+        evidence_id=req.evidence_id,
+        leaf_index=index,
+        leaf_count=len(tree),
+        leaf=tree.leaf(index),
+        proof=tree.proof(index),
+    )
 
 
 @app.get("/verdicts")
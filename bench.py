@@ -0,0 +1,190 @@
+"""Benchmark entry point — measure swarm engine overhead against a simulated provider.
+
+Runs the full runner → evaluator → aggregator path with `SimulatedProvider`
+(no network, no API keys) over a grid of committee sizes, iteration counts and
+concurrency levels, and reports ballots/s, event-loop lag, peak memory and
+time to verdict.
+
+    python bench.py
+    python bench.py --committee 3,5 --iterations 20,100 --in-flight lockstep,8,32 --json bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+
+from swarm.archetypes import ALL_ARCHETYPES
+from swarm.evaluator import CallPolicy
+from swarm.mock_evidence import MOCK_BUNDLES
+from swarm.routing import ProviderRouter
+from swarm.runner import run_swarm
+from swarm.sampler import make_sampler
+from swarm.simulated import LatencyModel, SimulatedProvider
+
+LAG_TICK_S = 0.005
+
+
+@dataclass
+class BenchResult:
+    committee_size: int
+    iterations: int
+    in_flight: str
+    ballots: int
+    requests: int
+    retries: int
+    hedges: int
+    failed_calls: int
+    time_to_verdict_s: float
+    ballots_per_s: float
+    loop_lag_p99_ms: float
+    loop_lag_max_ms: float
+    peak_mem_kb: float
+
+
+async def _measure_lag(samples: list[float], stop: asyncio.Event) -> None:
+    """Record how late each short sleep wakes up — time the loop spent blocked."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_TICK_S)
+        samples.append(max(0.0, time.perf_counter() - start - LAG_TICK_S))
+
+
+async def bench_one(
+    committee_size: int,
+    iterations: int,
+    max_in_flight: int | None,
+    args: argparse.Namespace,
+) -> BenchResult:
+    # Backend k is (1 + k) times slower than the first, so routing has something to learn
+    providers = [
+        SimulatedProvider(
+            model=f"simulated-{k}",
+            latency=LatencyModel(
+                median_s=args.latency_median * (1 + k), sigma=args.latency_sigma, timeout_s=args.timeout,
+            ),
+            error_rate=args.error_rate,
+            malformed_rate=args.malformed_rate,
+            seed=args.seed + k,
+        )
+        for k in range(args.providers)
+    ]
+    router = ProviderRouter()
+    sampler = make_sampler(
+        ALL_ARCHETYPES, providers, kind=args.sampler, seed=args.seed, routing=args.routing, router=router,
+    )
+
+    lags: list[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_measure_lag(lags, stop))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    verdict = await run_swarm(
+        MOCK_BUNDLES[args.bundle],
+        num_iterations=iterations,
+        committee_size=committee_size,
+        max_in_flight=max_in_flight,
+        stopping="none",
+        sampler=sampler,
+        completions_per_request=args.completions,
+        batch_submit=args.batch and max_in_flight is None,
+        call_policy=CallPolicy(
+            timeout_s=args.call_timeout,
+            max_retries=args.retries,
+            backoff_s=0.01,
+            hedge_percentile=args.hedge,
+            router=router,
+        ),
+    )
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stop.set()
+    await monitor
+
+    lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+    return BenchResult(
+        committee_size=committee_size,
+        iterations=iterations,
+        in_flight="lockstep" if max_in_flight is None else str(max_in_flight),
+        ballots=len(verdict.ballots),
+        requests=sum(p.calls for p in providers),
+        retries=verdict.call_stats.retries,
+        hedges=verdict.call_stats.hedges,
+        failed_calls=verdict.call_stats.failed,
+        time_to_verdict_s=round(elapsed, 4),
+        ballots_per_s=round(len(verdict.ballots) / elapsed, 1),
+        loop_lag_p99_ms=round(lags_ms[min(len(lags_ms) - 1, int(0.99 * len(lags_ms)))], 3),
+        loop_lag_max_ms=round(lags_ms[-1], 3),
+        peak_mem_kb=round(peak / 1024, 1),
+    )
+
+
+def _int_list(text: str) -> list[int]:
+    return [int(x) for x in text.split(",")]
+
+
+def _in_flight_list(text: str) -> list[int | None]:
+    return [None if x == "lockstep" else int(x) for x in text.split(",")]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--committee", type=_int_list, default=[3, 5])
+    parser.add_argument("--iterations", type=_int_list, default=[10, 50])
+    parser.add_argument("--in-flight", type=_in_flight_list, default=[None, 8, 32],
+                        help="comma-separated windows; 'lockstep' for one committee at a time")
+    parser.add_argument("--latency-median", type=float, default=0.05, help="median call latency (s)")
+    parser.add_argument("--latency-sigma", type=float, default=0.6, help="lognormal shape of latency")
+    parser.add_argument("--timeout", type=float, default=2.0, help="simulated call timeout (s)")
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--malformed-rate", type=float, default=0.01)
+    parser.add_argument("--call-timeout", type=float, default=None, help="CallPolicy deadline per attempt (s)")
+    parser.add_argument("--retries", type=int, default=0, help="CallPolicy retries per call")
+    parser.add_argument("--hedge", type=float, default=None, help="hedge after this latency quantile, e.g. 0.9")
+    parser.add_argument("--completions", type=int, default=1, help="completions per request (OpenAI n)")
+    parser.add_argument("--batch", action="store_true", help="lockstep cells: submit each block per provider as one batch")
+    parser.add_argument("--providers", type=int, default=1, help="simulated backends, each slower than the last")
+    parser.add_argument("--routing", default="uniform", choices=["uniform", "adaptive"])
+    parser.add_argument("--sampler", default="random", choices=["random", "stratified"])
+    parser.add_argument("--bundle", type=int, default=0, help="index into MOCK_BUNDLES")
+    parser.add_argument("--repeats", type=int, default=1, help="runs per cell; the median is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="also write results to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep swarm logging (failed calls are logged)")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        # Simulated failures would otherwise flood stderr with tracebacks
+        logging.disable(logging.CRITICAL)
+
+    results: list[BenchResult] = []
+    for committee, iterations, in_flight in itertools.product(args.committee, args.iterations, args.in_flight):
+        runs = [await bench_one(committee, iterations, in_flight, args) for _ in range(args.repeats)]
+        results.append(sorted(runs, key=lambda r: r.time_to_verdict_s)[len(runs) // 2])
+
+    header = f"{'committee':>9} {'iters':>6} {'window':>9} {'ballots':>8} {'requests':>9} {'retries':>8} " \
+             f"{'hedges':>7} {'failed':>7} {'verdict_s':>10} {'ballots/s':>10} {'lag_p99_ms':>11} " \
+             f"{'lag_max_ms':>11} {'peak_kb':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r.committee_size:>9} {r.iterations:>6} {r.in_flight:>9} {r.ballots:>8} {r.requests:>9} {r.retries:>8} "
+              f"{r.hedges:>7} {r.failed_calls:>7} {r.time_to_verdict_s:>10.3f} {r.ballots_per_s:>10.1f} "
+              f"{r.loop_lag_p99_ms:>11.3f} {r.loop_lag_max_ms:>11.3f} {r.peak_mem_kb:>9.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
+        print(f"\nResults written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
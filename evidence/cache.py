@@ -0,0 +1,65 @@
+"""Persistent cache for planner output and search results, with per-entry TTLs."""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+import time
+
+from swarm.cache import SqliteLRUStore, get_store
+
+from evidence.config import EVIDENCE_CACHE_MAX_BYTES, EVIDENCE_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+# "use" reads and writes the cache, "refresh" skips reads but stores fresh
+# results, "bypass" neither reads nor writes.
+EVIDENCE_CACHE_MODES = ("use", "refresh", "bypass")
+
+# Entries are {"stored_at", "value"} envelopes; the format is part of the key
+_FORMAT = 2
+
+
+def check_mode(mode: str) -> str:
+    if mode not in EVIDENCE_CACHE_MODES:
+        raise ValueError(f"Unknown evidence cache mode {mode!r}; expected one of {EVIDENCE_CACHE_MODES}")
+    return mode
+
+
+def normalize_question(question: str) -> str:
+    """Case- and whitespace-insensitive form of a question, used as its cache key."""
+    return re.sub(r"\s+", " ", question).strip().lower()
+
+
+def _key(namespace: str, *parts: object) -> str:
+    payload = json.dumps([namespace, _FORMAT, *parts], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _store() -> SqliteLRUStore:
+    return get_store(EVIDENCE_CACHE_PATH, EVIDENCE_CACHE_MAX_BYTES)
+
+
+def cache_get(mode: str, namespace: str, *parts: object) -> tuple[object, float] | None:
+    """(cached JSON value, age in seconds) for (namespace, *parts).
+
+    None on a miss, or unless `mode` is "use".
+    """
+    if check_mode(mode) != "use":
+        return None
+    raw = _store().get(_key(namespace, *parts))
+    if raw is None:
+        return None
+    entry = json.loads(raw)
+    age_s = max(0.0, time.time() - entry["stored_at"])
+    logger.debug("Evidence cache hit (%.0fs old): %s %s", age_s, namespace, parts)
+    return entry["value"], age_s
+
+
+def cache_put(mode: str, namespace: str, *parts: object, value, ttl_s: float) -> None:
+    """Store a JSON-serializable value for `ttl_s` seconds unless `mode` is "bypass"."""
+    if check_mode(mode) == "bypass":
+        return
+    entry = {"stored_at": time.time(), "value": value}
+    _store().put(_key(namespace, *parts), json.dumps(entry, ensure_ascii=False).encode(), ttl_s)
@@ -1,64 +1,236 @@
 """Evidence collector — runs search queries via Tavily and returns raw results."""
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import logging
 import os
+import re
+import time
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
+from typing import Callable
 
+import numpy as np
 from dotenv import load_dotenv
 from tavily import AsyncTavilyClient
 
+from evidence.cache import cache_get, cache_put
+from evidence.config import (
+    EVIDENCE_CACHE_MODE,
+    NEAR_DUPLICATE_SIMILARITY,
+    SEARCH_CACHE_TTL_S,
+    SEARCH_CONCURRENCY,
+    SEARCH_RESULTS_PER_QUERY,
+    SEARCH_TIMEOUT_S,
+)
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
 
-async def collect(queries: list[str], max_results_per_query: int = 3) -> list[dict]:
-    """Run search queries via Tavily and return deduplicated evidence items.
+@dataclass
+class QueryReport:
+    """Outcome of one search query."""
+
+    query: str
+    latency_s: float
+    results: list[dict] = field(default_factory=list)   # raw Tavily results, in rank order
+    error: str | None = None
+    cached: bool = False
+    cache_age_s: float | None = None                     # age of the cached results, if served from cache
+
+
+async def search_all(
+    queries: list[str],
+    max_results_per_query: int = SEARCH_RESULTS_PER_QUERY,
+    max_concurrency: int = SEARCH_CONCURRENCY,
+    on_query_done: Callable[[QueryReport], None] | None = None,
+    cache: str = EVIDENCE_CACHE_MODE,
+    semaphore: asyncio.Semaphore | None = None,
+) -> list[QueryReport]:
+    """Run the queries concurrently, at most `max_concurrency` at a time.
 
-    Each item has: url, snippet, timestamp.
+    Pass a shared `semaphore` instead to hold several concurrent
+    `search_all` calls to one limit together.
+
+    A failing or timed-out query yields a report with `error` set and no
+    results; the others are unaffected. `on_query_done` is called as each
+    query finishes. Reports come back in query order regardless of which
+    search finished first. Results are cached per (query, max_results) for
+    `SEARCH_CACHE_TTL_S`; `cache` is "use", "refresh" or "bypass".
     """
+    reports: dict[int, QueryReport] = {}
+    for i, query in enumerate(queries):
+        hit = cache_get(cache, "search", query, max_results_per_query)
+        if hit is not None:
+            results, age_s = hit
+            reports[i] = QueryReport(query, 0.0, results, cached=True, cache_age_s=age_s)
+            if on_query_done is not None:
+                on_query_done(reports[i])
+    if len(reports) == len(queries):
+        logger.info("All %d queries served from the evidence cache", len(queries))
+        return [reports[i] for i in range(len(queries))]
+
     api_key = os.environ.get("TAVILY_API_KEY")
     if not api_key:
         raise RuntimeError("TAVILY_API_KEY not set in .env")
 
     client = AsyncTavilyClient(api_key=api_key)
-    seen_urls: set[str] = set()
-    results: list[dict] = []
+    semaphore = semaphore or asyncio.Semaphore(max_concurrency)
 
-    for query in queries:
-        try:
-            response = await client.search(
-                query=query,
-                max_results=max_results_per_query,
-                include_answer=False,
-            )
-        except Exception:
-            logger.exception("Tavily search failed for query: %s", query)
-            continue
+    async def run(query: str) -> QueryReport:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    client.search(query=query, max_results=max_results_per_query, include_answer=False),
+                    SEARCH_TIMEOUT_S,
+                )
+                report = QueryReport(query, time.perf_counter() - start, response.get("results", []))
+            except Exception as e:
+                logger.exception("Tavily search failed for query: %s", query)
+                report = QueryReport(query, time.perf_counter() - start, error=repr(e))
+        logger.info("Query %r: %d results in %.2fs", query, len(report.results), report.latency_s)
+        if report.error is None:
+            cache_put(cache, "search", query, max_results_per_query, value=report.results, ttl_s=SEARCH_CACHE_TTL_S)
+        if on_query_done is not None:
+            on_query_done(report)
+        return report
+
+    misses = [i for i in range(len(queries)) if i not in reports]
+    for i, report in zip(misses, await asyncio.gather(*(run(queries[i]) for i in misses))):
+        reports[i] = report
+    return [reports[i] for i in range(len(queries))]
+
+
+def _evidence_item(item: dict) -> dict:
+    snippet = item.get("content", "")
+    # Trim snippet to ~200 words
+    words = snippet.split()
+    if len(words) > 200:
+        snippet = " ".join(words[:200]) + "..."
 
-        for item in response.get("results", []):
+    timestamp = item.get("published_date") or datetime.now(timezone.utc).strftime(
+        "%Y-%m-%dT%H:%M:%SZ"
+    )
+    return {
+        "url": item.get("url", ""),
+        "snippet": snippet,
+        "timestamp": timestamp,
+    }
+
+
+def merge_results(reports: list[QueryReport]) -> list[dict]:
+    """Flatten reports into evidence items, deduplicated by URL in query-then-rank order."""
+    seen_urls: set[str] = set()
+    results: list[dict] = []
+    for report in reports:
+        for item in report.results:
             url = item.get("url", "")
             if url in seen_urls:
                 continue
             seen_urls.add(url)
+            results.append(_evidence_item(item))
+    return results
 
-            snippet = item.get("content", "")
-            # Trim snippet to ~200 words
-            words = snippet.split()
-            if len(words) > 200:
-                snippet = " ".join(words[:200]) + "..."
 
-            timestamp = item.get("published_date") or datetime.now(timezone.utc).strftime(
-                "%Y-%m-%dT%H:%M:%SZ"
-            )
+# ── Near-duplicate suppression ─────────────────────────────────────
 
-            results.append({
-                "url": url,
-                "snippet": snippet,
-                "timestamp": timestamp,
-            })
+SHINGLE_WORDS = 2
 
-    logger.info("Collected %d evidence items from %d queries", len(results), len(queries))
 
-    # Cap at 6 items to keep the swarm prompt lean
-    return results[:6]
+@dataclass
+class NearDuplicate:
+    """An evidence item dropped because its snippet nearly repeats a kept one."""
+
+    url: str
+    duplicate_of: str   # URL of the kept item
+    similarity: float   # share of agreeing SimHash bits
+
+
+def simhash(text: str) -> int | None:
+    """64-bit SimHash over word shingles of `text`; None if it has no words."""
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") for s in shingles],
+        dtype="<u8",
+    )
+    # One row of 64 bits per shingle (column k = bit k); a bit is set where most shingles set it
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    majority = 2 * bits.sum(axis=0, dtype=np.int64) > len(shingles)
+    return int(np.packbits(majority, bitorder="little").view("<u8")[0])
+
+
+def suppress_near_duplicates(
+    items: list[dict],
+    threshold: float = NEAR_DUPLICATE_SIMILARITY,
+) -> tuple[list[dict], list[NearDuplicate]]:
+    """Keep the first of each group of near-identical snippets, in order.
+
+    Syndicated or copied articles on different URLs otherwise crowd out
+    distinct sources. Unrelated snippets agree on about half of the 64
+    bits, so thresholds near 0.8 leave them alone. Returns (kept items,
+    what was dropped and why).
+    """
+    kept: list[dict] = []
+    fingerprints: list[int | None] = []
+    dropped: list[NearDuplicate] = []
+    for item in items:
+        fp = simhash(item["snippet"])
+        match = None
+        if fp is not None:
+            for other, other_fp in zip(kept, fingerprints):
+                if other_fp is None:
+                    continue
+                similarity = 1.0 - bin(fp ^ other_fp).count("1") / 64
+                if similarity >= threshold:
+                    match = NearDuplicate(item["url"], other["url"], similarity)
+                    break
+        if match is not None:
+            dropped.append(match)
+            continue
+        kept.append(item)
+        fingerprints.append(fp)
+    return kept, dropped
+
+
+def candidate_evidence(reports: list[QueryReport]) -> list[dict]:
+    """Evidence items from finished searches, without URL or near-duplicate repeats."""
+    results = merge_results(reports)
+    if NEAR_DUPLICATE_SIMILARITY is not None:
+        results, duplicates = suppress_near_duplicates(results)
+        for dup in duplicates:
+            logger.info("Dropped %s: near-duplicate of %s (%.2f)", dup.url, dup.duplicate_of, dup.similarity)
+    return results
+
+
+async def collect(
+    queries: list[str],
+    max_results_per_query: int = SEARCH_RESULTS_PER_QUERY,
+    max_concurrency: int = SEARCH_CONCURRENCY,
+    on_query_done: Callable[[QueryReport], None] | None = None,
+    cache: str = EVIDENCE_CACHE_MODE,
+) -> list[dict]:
+    """Run search queries via Tavily and return deduplicated candidate evidence.
+
+    Each item has: url, snippet, timestamp. Queries run concurrently, but the
+    items are ordered by query and then rank regardless of which search
+    finished first. Near-duplicate snippets are dropped. Every candidate is
+    returned; `evidence.ranker.select_evidence` picks the bundle.
+    `cache` is passed to `search_all`.
+    """
+    start = time.perf_counter()
+    reports = await search_all(queries, max_results_per_query, max_concurrency, on_query_done, cache)
+    results = candidate_evidence(reports)
+
+    failed = sum(r.error is not None for r in reports)
+    cached = sum(r.cached for r in reports)
+    logger.info(
+        "Collected %d candidate evidence items from %d queries (%d cached, %d failed) in %.2fs",
+        len(results), len(queries), cached, failed, time.perf_counter() - start,
+    )
+    return results
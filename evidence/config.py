@@ -0,0 +1,24 @@
+import os
+
+# Default "bypass": an oracle resolving live events should not serve hours-old search results
+EVIDENCE_CACHE_MODE = os.environ.get("EVIDENCE_CACHE_MODE", "bypass")  # "use", "refresh" (rebuild) or "bypass"
+EVIDENCE_CACHE_PATH = "cache/evidence.sqlite"
+EVIDENCE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # LRU eviction above this many bytes of plans and search results
+PLANNER_CACHE_TTL_S = 7 * 24 * 3600   # planner queries and rubric per normalized question
+SEARCH_CACHE_TTL_S = 6 * 3600         # search results per (query, max_results)
+SEARCH_CONCURRENCY = 4       # evidence search queries in flight at once
+SEARCH_TIMEOUT_S = 20.0      # deadline per search query
+SPECULATIVE_SEARCH = True    # /resolve/stream: search the question itself while the planner runs (one extra search; skipped if the plan is cached)
+SEARCH_RESULTS_PER_QUERY = 5 # candidates per query; the ranker picks the bundle from all of them
+NEAR_DUPLICATE_SIMILARITY = 0.8  # drop evidence whose snippet SimHash agrees with a kept one on this share of bits (None = off)
+EVIDENCE_MAX_ITEMS = 6       # evidence items per bundle
+EVIDENCE_TOKEN_BUDGET = 1500 # estimated prompt tokens of evidence per bundle
+RANK_RELEVANCE_WEIGHT = 0.7  # evidence score = w * BM25 relevance + (1 - w) * source quality
+BM25_K1 = 1.2                # BM25 term-frequency saturation
+BM25_B = 0.75                # BM25 length normalization
+DOMAIN_REPUTATION_PATH = os.environ.get("DOMAIN_REPUTATION_PATH", "data/domain_reputation.npy")  # built by `python -m evidence.reputation`
+REPUTATION_RELOAD_S = 5.0    # how often to check the reputation file for changes
+MERKLE_VERSION = 1           # bundle commitment scheme: 1 = legacy hex/JSON (on-chain default), 2 = binary, domain-separated
+MERKLE_TREE_CACHE_SIZE = 256 # evidence Merkle trees kept in memory to serve inclusion proofs
+MERKLE_HASH_BATCH = 4096     # leaves read and hashed per batch when streaming a large commitment
+MERKLE_HASH_WORKERS = 4      # hashing threads for streaming commitments of leaves over 2 KB
@@ -3,6 +3,25 @@ from __future__ import annotations
 
 import hashlib
 import json
+import mmap
+import struct
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator
+
+from evidence.config import MERKLE_HASH_BATCH, MERKLE_HASH_WORKERS, MERKLE_TREE_CACHE_SIZE
+
+EMPTY_ROOT = "0x" + "0" * 64
+NODE = 32   # bytes per node
+
+# Version 1 is the original scheme: leaves hash sorted-key JSON, parents
+# hash the concatenated hex of their children, and an odd last node is paired
+# with itself (so [a, b, c] and [a, b, c, c] share a root). Version 2 follows
+# RFC 6962: a canonical binary encoding, raw child bytes, domain separation
+# between leaves and nodes, and an odd last node promoted to the next level
+# unchanged.
+MERKLE_VERSIONS = (1, 2)
 
 
 def hash_evidence(item: dict) -> str:
@@ -10,15 +29,317 @@ def hash_evidence(item: dict) -> str:
     return hashlib.sha256(json.dumps(item, sort_keys=True).encode()).hexdigest()
 
 
-def merkle_root(hashes: list[str]) -> str:
+# ── Leaf encodings ─────────────────────────────────────────────────
+
+def _field(text: str) -> bytes:
+    data = text.encode()
+    return struct.pack(">I", len(data)) + data
+
+
+def encode_question(question: str, version: int = 1) -> bytes:
+    """Bytes hashed into the question leaf."""
+    return question.encode() if version == 1 else b"Q" + _field(question)
+
+
+def encode_item(item: dict, version: int = 1) -> bytes:
+    """Bytes hashed into an evidence leaf.
+
+    Version 2 is `E`, then the id as uint32, url, snippet and timestamp as
+    length-prefixed UTF-8, and the quality score as a float64, all big-endian.
+    """
+    if version == 1:
+        return json.dumps(item, sort_keys=True).encode()
+    return (
+        b"E" + struct.pack(">I", item["id"])
+        + _field(item["url"]) + _field(item["snippet"]) + _field(item["timestamp"])
+        + struct.pack(">d", item["quality_score"])
+    )
+
+
+def hash_leaf(encoded: bytes, version: int = 1) -> bytes:
+    return hashlib.sha256(encoded if version == 1 else b"\x00" + encoded).digest()
+
+
+def bundle_leaves(question: str, evidence: list[dict], version: int = 1) -> list[str]:
+    """Leaf hashes of a bundle: the question first, then each evidence item in order."""
+    encoded = [encode_question(question, version)] + [encode_item(e, version) for e in evidence]
+    return [hash_leaf(data, version).hex() for data in encoded]
+
+
+def _parent_v1(left: bytes, right: bytes) -> bytes:
+    # Parents hash the hex strings of their children, as the on-chain roots always have
+    return hashlib.sha256((left.hex() + right.hex()).encode()).digest()
+
+
+def _parent_v2(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def parent_hash(version: int) -> Callable[[bytes, bytes], bytes]:
+    if version not in MERKLE_VERSIONS:
+        raise ValueError(f"Unknown Merkle version {version}; expected one of {MERKLE_VERSIONS}")
+    return _parent_v1 if version == 1 else _parent_v2
+
+
+def _strip(h: str) -> str:
+    return h[2:] if h.startswith("0x") else h
+
+
+class MerkleTree:
+    """Binary SHA-256 Merkle tree that keeps every level for proofs.
+
+    Levels are packed `bytearray`s of 32-byte nodes. An odd node at the end
+    of a level is paired with itself in version 1 and promoted unchanged in
+    version 2. `append` updates only the path from
+    the new leaf to the root, so growing a tree costs O(log n) hashes per
+    leaf and gives the same root as building it in one go.
+    """
+
+    def __init__(self, leaves: Iterable[str] = (), version: int = 1):
+        self.version = version
+        self._parent = parent_hash(version)
+        self._promote = version != 1
+        self._levels: list[bytearray] = [bytearray()]
+        for leaf in leaves:
+            self.append(leaf)
+
+    def __len__(self) -> int:
+        return len(self._levels[0]) // NODE
+
+    def _node(self, level: int, index: int) -> bytes:
+        return bytes(self._levels[level][index * NODE:(index + 1) * NODE])
+
+    def append(self, leaf: str) -> None:
+        """Add a hex leaf hash and update its path to the root."""
+        self._levels[0] += bytes.fromhex(_strip(leaf))
+        index, level = len(self) - 1, 0
+        while len(self._levels[level]) > NODE:
+            width = len(self._levels[level]) // NODE
+            left = index & ~1
+            if left + 1 < width:
+                parent = self._parent(self._node(level, left), self._node(level, left + 1))
+            elif self._promote:
+                parent = self._node(level, left)
+            else:
+                parent = self._parent(self._node(level, left), self._node(level, left))
+            if level + 1 == len(self._levels):
+                self._levels.append(bytearray())
+            above = self._levels[level + 1]
+            index //= 2
+            above[index * NODE:(index + 1) * NODE] = parent
+            level += 1
+
+    @property
+    def root(self) -> str:
+        if not len(self):
+            return EMPTY_ROOT
+        return "0x" + self._node(len(self._levels) - 1, 0).hex()
+
+    def leaf(self, index: int) -> str:
+        return self._node(0, index).hex()
+
+    def proof(self, index: int) -> list[str]:
+        """Sibling hashes from leaf `index` up to the root (hex, bottom first).
+
+        Version 2 has no sibling at levels where the node is promoted.
+        """
+        if not 0 <= index < len(self):
+            raise IndexError(f"leaf {index} out of range for a tree of {len(self)}")
+        siblings = []
+        for level in range(len(self._levels) - 1):
+            width = len(self._levels[level]) // NODE
+            sibling = index ^ 1
+            if sibling < width:
+                siblings.append(self._node(level, sibling).hex())
+            elif not self._promote:
+                siblings.append(self._node(level, index).hex())
+            index //= 2
+        return siblings
+
+
+def _fold(
+    leaf: str,
+    index: int,
+    leaf_count: int,
+    proof: list[str],
+    version: int,
+    memo: dict[tuple[bytes, bytes], bytes],
+) -> str | None:
+    """Root implied by `proof`, or None if it cannot come from leaf `index` of a `leaf_count`-leaf tree."""
+    if not 0 <= index < leaf_count:
+        return None
+    parent = parent_hash(version)
+    node, width, used = bytes.fromhex(_strip(leaf)), leaf_count, 0
+    while width > 1:
+        lone = index ^ 1 >= width
+        # Version 2 promotes a lone last node without a sibling in the proof
+        if not (lone and version != 1):
+            if used == len(proof):
+                return None
+            other = bytes.fromhex(proof[used])
+            used += 1
+            # Version 1 pairs it with itself; any other sibling means a position past the end
+            if lone and other != node:
+                return None
+            pair = (node, other) if index % 2 == 0 else (other, node)
+            if pair not in memo:
+                memo[pair] = parent(*pair)
+            node = memo[pair]
+        index, width = index // 2, (width + 1) // 2
+    if used != len(proof):
+        return None
+    return "0x" + node.hex()
+
+
+def verify_proof(leaf: str, index: int, leaf_count: int, proof: list[str], root: str, version: int = 1) -> bool:
+    """Check that `leaf` sits at `index` of the `leaf_count` leaves under `root`."""
+    folded = _fold(leaf, index, leaf_count, proof, version, {})
+    return folded is not None and folded.lower() == root.lower()
+
+
+def verify_proofs(
+    root: str, leaf_count: int, proofs: list[tuple[str, int, list[str]]], version: int = 1,
+) -> list[bool]:
+    """Check many (leaf, index, proof) triples against one root over `leaf_count` leaves.
+
+    Paths of neighbouring leaves converge, so each shared node is hashed once.
+    """
+    memo: dict[tuple[bytes, bytes], bytes] = {}
+    results = []
+    for leaf, index, proof in proofs:
+        folded = _fold(leaf, index, leaf_count, proof, version, memo)
+        results.append(folded is not None and folded.lower() == root.lower())
+    return results
+
+
+def merkle_root(hashes: list[str], version: int = 1) -> str:
     """Compute the Merkle root from a list of leaf hashes."""
-    if not hashes:
-        return "0x" + "0" * 64
-    while len(hashes) > 1:
-        if len(hashes) % 2 == 1:
-            hashes.append(hashes[-1])  # duplicate last if odd
-        hashes = [
-            hashlib.sha256((hashes[i] + hashes[i + 1]).encode()).hexdigest()
-            for i in range(0, len(hashes), 2)
-        ]
-    return "0x" + hashes[0]
+    return MerkleTree(hashes, version).root
+
+
+# ── Streaming commitment ───────────────────────────────────────────
+
+class StreamingMerkleBuilder:
+    """Computes a Merkle root from leaves as they arrive, holding O(log n) nodes.
+
+    `pending[k]` is a level-k node still waiting for its right sibling. The
+    root is the same as `MerkleTree` over the same leaves and version, and
+    may be read at any point without disturbing the stream.
+    """
+
+    def __init__(self, version: int = 2):
+        self.version = version
+        self._parent = parent_hash(version)
+        self._pending: list[bytes | None] = []
+        self.count = 0
+
+    def add(self, leaf: bytes) -> None:
+        """Add one 32-byte leaf hash."""
+        node, level = leaf, 0
+        while True:
+            if level == len(self._pending):
+                self._pending.append(None)
+            if self._pending[level] is None:
+                self._pending[level] = node
+                break
+            node = self._parent(self._pending[level], node)
+            self._pending[level] = None
+            level += 1
+        self.count += 1
+
+    def root(self) -> str:
+        if not self.count:
+            return EMPTY_ROOT
+        top, width = 0, self.count
+        while width > 1:
+            width = (width + 1) // 2
+            top += 1
+        # Close each level bottom-up: `carry` is the last node of the level, if any.
+        # A lone last node is paired with itself (version 1) or promoted (version 2).
+        carry: bytes | None = None
+        promote = self.version != 1
+        for level in range(top):
+            node = self._pending[level] if level < len(self._pending) else None
+            if node is not None and carry is not None:
+                carry = self._parent(node, carry)
+            elif node is not None:
+                carry = node if promote else self._parent(node, node)
+            elif carry is not None and not promote:
+                carry = self._parent(carry, carry)
+        pending_top = self._pending[top] if top < len(self._pending) else None
+        return "0x" + (pending_top if pending_top is not None else carry).hex()
+
+
+# hashlib only releases the GIL while hashing inputs longer than this
+_GIL_RELEASE_BYTES = 2047
+
+
+def _hash_slice(encoded: list[bytes], version: int) -> list[bytes]:
+    return [hash_leaf(data, version) for data in encoded]
+
+
+def hash_leaves(
+    encoded: Iterable[bytes],
+    version: int = 2,
+    batch_size: int = MERKLE_HASH_BATCH,
+    workers: int = MERKLE_HASH_WORKERS,
+) -> Iterator[bytes]:
+    """Leaf hashes of encoded leaves, in order, read `batch_size` at a time.
+
+    Only one batch is held in memory. hashlib holds the GIL on inputs of up
+    to 2 KB, where threads cannot hash in parallel, so batches of such leaves
+    are hashed inline. Batches of larger leaves are split into one slice per
+    worker, each hashed by a single thread-pool task.
+    """
+    it = iter(encoded)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while batch := list(islice(it, batch_size)):
+            if workers <= 1 or sum(map(len, batch)) <= _GIL_RELEASE_BYTES * len(batch):
+                yield from _hash_slice(batch, version)
+                continue
+            step = -(-len(batch) // workers)
+            slices = [batch[i:i + step] for i in range(0, len(batch), step)]
+            for hashes in pool.map(_hash_slice, slices, [version] * len(slices)):
+                yield from hashes
+
+
+def stream_root(encoded: Iterable[bytes], version: int = 2, **hashing) -> str:
+    """Merkle root of encoded leaves from any iterable (e.g. a generator over a crawl)."""
+    builder = StreamingMerkleBuilder(version)
+    for leaf in hash_leaves(encoded, version, **hashing):
+        builder.add(leaf)
+    return builder.root()
+
+
+def leaf_file_root(path: str, version: int = 2) -> str:
+    """Merkle root over a file of concatenated 32-byte leaf hashes, read through mmap."""
+    builder = StreamingMerkleBuilder(version)
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return EMPTY_ROOT
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if len(data) % NODE:
+                raise ValueError(f"{path} is not a whole number of {NODE}-byte leaves")
+            for offset in range(0, len(data), NODE):
+                builder.add(data[offset:offset + NODE])
+    return builder.root()
+
+
+# ── Tree cache ─────────────────────────────────────────────────────
+
+_trees: OrderedDict[str, MerkleTree] = OrderedDict()
+
+
+def remember_tree(tree: MerkleTree) -> None:
+    """Keep `tree` for proof requests by its root, evicting the least recently used."""
+    _trees[tree.root] = tree
+    _trees.move_to_end(tree.root)
+    while len(_trees) > MERKLE_TREE_CACHE_SIZE:
+        _trees.popitem(last=False)
+
+
+def cached_tree(root: str) -> MerkleTree | None:
+    tree = _trees.get(root)
+    if tree is not None:
+        _trees.move_to_end(root)
+    return tree
@@ -1,57 +1,152 @@
 """Evidence pipeline orchestrator — question → EvidenceBundle."""
 from __future__ import annotations
 
-import hashlib
+import asyncio
 import logging
+from dataclasses import dataclass
+from typing import AsyncIterator
 
 from swarm.schemas import EvidenceBundle, EvidenceItem
 
-from evidence.collector import collect
-from evidence.merkle import hash_evidence, merkle_root
-from evidence.planner import plan
-from evidence.scorer import score_quality
+from evidence.cache import normalize_question
+from evidence.config import EVIDENCE_CACHE_MODE, MERKLE_VERSION, SEARCH_CONCURRENCY
+from evidence.collector import QueryReport, candidate_evidence, search_all
+from evidence.merkle import MerkleTree, bundle_leaves, remember_tree
+from evidence.planner import cached_plan, plan
+from evidence.ranker import select_evidence
+from evidence.scorer import score_many
 
 logger = logging.getLogger(__name__)
 
 
-async def build_evidence_bundle(question: str) -> EvidenceBundle:
-    """Full pipeline: question → plan → collect → score → hash → EvidenceBundle."""
+@dataclass
+class StageEvent:
+    """Progress of one pipeline stage: "plan" or "search"."""
 
-    # 1. Plan — LLM generates search queries + rubric
-    queries, rubric = await plan(question)
+    stage: str
+    data: dict
 
-    # 2. Collect — Tavily search
-    raw_evidence = await collect(queries)
 
-    if not raw_evidence:
+def _search_event(report: QueryReport) -> StageEvent:
+    urls = [item.get("url", "") for item in report.results]
+    return StageEvent("search", {
+        "query": report.query,
+        "latency_s": round(report.latency_s, 3),
+        "cached": report.cached,
+        "cache_age_s": report.cache_age_s,
+        "error": report.error,
+        "results": [{"url": u, "quality_score": q} for u, q in zip(urls, score_many(urls))],
+    })
+
+
+async def stream_evidence_bundle(
+    question: str,
+    cache: str = EVIDENCE_CACHE_MODE,
+    speculative_search: bool = False,
+) -> AsyncIterator[StageEvent | EvidenceBundle]:
+    """Yield stage events as the pipeline runs, then the committed EvidenceBundle.
+
+    The planned queries start the moment the plan is parsed. With
+    `speculative_search`, the question itself is also searched while the
+    planner is still running; this costs one extra search, so it is skipped
+    when the plan comes from the cache and there is no planner latency to
+    hide. Both searches share one `SEARCH_CONCURRENCY` limit. Each finished
+    search is reported with its URLs already quality-scored. Results are
+    merged in query order (the question first), so the bundle does not
+    depend on which search finished first.
+    """
+    events: asyncio.Queue[StageEvent] = asyncio.Queue()
+    searches = asyncio.Semaphore(SEARCH_CONCURRENCY)
+
+    async def gather() -> tuple[list[str], list[QueryReport]]:
+        planned_already = cached_plan(question, cache)
+        early = None
+        if speculative_search and planned_already is None:
+            early = asyncio.ensure_future(
+                search_all([question], on_query_done=_report, cache=cache, semaphore=searches)
+            )
+        try:
+            queries, rubric = planned_already or await plan(question, cache)
+            events.put_nowait(StageEvent("plan", {"queries": queries, "rubric": rubric}))
+            if early is not None:
+                queries = [q for q in queries if normalize_question(q) != normalize_question(question)]
+            planned = await search_all(queries, on_query_done=_report, cache=cache, semaphore=searches)
+            return rubric, (await early if early is not None else []) + planned
+        finally:
+            if early is not None:
+                early.cancel()
+
+    def _report(report: QueryReport) -> None:
+        events.put_nowait(_search_event(report))
+
+    task = asyncio.ensure_future(gather())
+    try:
+        while not task.done() or not events.empty():
+            getter = asyncio.ensure_future(events.get())
+            await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+            else:
+                getter.cancel()
+        rubric, reports = task.result()
+    finally:
+        task.cancel()
+
+    candidates = candidate_evidence(reports)
+    if not candidates:
         raise ValueError(f"No evidence found for question: {question}")
 
-    # 3. Score + build evidence items
+    # Rank — relevance and source quality, top-k under the token budget
+    raw_evidence = select_evidence(question, candidates)
+
+    # Score + build evidence items
+    quality = score_many([item["url"] for item in raw_evidence])
     evidence = [
         EvidenceItem(
             id=i + 1,
             url=item["url"],
             snippet=item["snippet"],
             timestamp=item["timestamp"],
-            quality_score=score_quality(item["url"]),
+            quality_score=quality[i],
         )
         for i, item in enumerate(raw_evidence)
     ]
 
-    # 4. Merkle hash (question included as first leaf)
-    question_hash = hashlib.sha256(question.encode()).hexdigest()
-    evidence_hashes = [hash_evidence(e.model_dump()) for e in evidence]
-    root = merkle_root([question_hash] + evidence_hashes)
+    # Merkle hash (question included as first leaf); the tree is kept to serve proofs
+    leaves = bundle_leaves(question, [e.model_dump() for e in evidence], MERKLE_VERSION)
+    tree = MerkleTree(leaves, MERKLE_VERSION)
+    remember_tree(tree)
+    root = tree.root
 
     logger.info(
-        "Built evidence bundle: %d items, merkle_root=%s",
+        "Built evidence bundle: %d items from %d candidates, merkle_root=%s",
         len(evidence),
+        len(candidates),
         root[:18] + "...",
     )
 
-    return EvidenceBundle(
+    # Say how stale any cached search results are; the commitment itself does not cover this
+    ages = [r.cache_age_s for r in reports if r.cache_age_s is not None]
+
+    yield EvidenceBundle(
         question=question,
         rubric=rubric,
         evidence=evidence,
         merkle_root=root,
+        merkle_version=MERKLE_VERSION,
+        evidence_cache_age_s=round(max(ages), 1) if ages else None,
     )
+
+
+async def build_evidence_bundle(question: str, cache: str = EVIDENCE_CACHE_MODE) -> EvidenceBundle:
+    """Full pipeline: question → plan → collect → rank → score → hash → EvidenceBundle.
+
+    `cache` controls the planner and search cache: "use", "refresh" (ignore
+    cached entries and store fresh ones) or "bypass". This drains
+    `stream_evidence_bundle`.
+    """
+    bundle = None
+    async for item in stream_evidence_bundle(question, cache):
+        if isinstance(item, EvidenceBundle):
+            bundle = item
+    return bundle
@@ -5,7 +5,10 @@ import json
 import logging
 import re
 
-from swarm.models import OpenAIProvider
+from swarm.models import get_registry
+
+from evidence.cache import cache_get, cache_put, normalize_question
+from evidence.config import EVIDENCE_CACHE_MODE, PLANNER_CACHE_TTL_S
 
 logger = logging.getLogger(__name__)
 
@@ -24,12 +27,27 @@ Respond with a single JSON object:
 DEFAULT_RUBRIC = ["evidence_quality", "claim_specificity", "source_reliability"]
 
 
-async def plan(question: str) -> tuple[list[str], list[str]]:
+def cached_plan(question: str, cache: str = EVIDENCE_CACHE_MODE) -> tuple[list[str], list[str]] | None:
+    """The cached (search_queries, rubric) for a question, if any."""
+    hit = cache_get(cache, "plan", normalize_question(question))
+    if hit is None:
+        return None
+    data, _ = hit
+    return data["queries"], data["rubric"]
+
+
+async def plan(question: str, cache: str = EVIDENCE_CACHE_MODE) -> tuple[list[str], list[str]]:
     """Generate search queries and rubric for a question.
 
-    Returns (search_queries, rubric).
+    Plans are cached per normalized question for `PLANNER_CACHE_TTL_S`;
+    `cache` is "use", "refresh" or "bypass" (see `evidence.cache`).
+    Fallback plans are never cached. Returns (search_queries, rubric).
     """
-    provider = OpenAIProvider()
+    cached = cached_plan(question, cache)
+    if cached is not None:
+        return cached
+
+    provider = get_registry().get()
 
     try:
         response = await provider.complete(
@@ -43,9 +61,13 @@ async def plan(question: str) -> tuple[list[str], list[str]]:
 
         if not queries:
             logger.warning("Planner returned no queries, using fallback")
-            queries = [question]
+            return [question], rubric
 
         logger.info("Planner generated %d queries: %s", len(queries), queries)
+        cache_put(
+            cache, "plan", normalize_question(question),
+            value={"queries": queries, "rubric": rubric}, ttl_s=PLANNER_CACHE_TTL_S,
+        )
         return queries, rubric
 
     except Exception:
@@ -0,0 +1,121 @@
+"""Evidence ranking — BM25 relevance to the question plus source quality, under a token budget."""
+from __future__ import annotations
+
+import logging
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+from swarm.config import CHARS_PER_TOKEN
+
+from evidence.config import (
+    BM25_B,
+    BM25_K1,
+    EVIDENCE_MAX_ITEMS,
+    EVIDENCE_TOKEN_BUDGET,
+    RANK_RELEVANCE_WEIGHT,
+)
+from evidence.scorer import score_many
+
+logger = logging.getLogger(__name__)
+
+STOPWORDS = frozenset(
+    "a an and are as at be by did does do for from has have how in is it its of on or "
+    "than that the this to was were what when where which who will with would".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [w for w in re.findall(r"\w+", text.lower()) if w not in STOPWORDS]
+
+
+# ── Corpus statistics ──────────────────────────────────────────────
+
+class CorpusStats:
+    """Document frequencies and average length over one candidate set.
+
+    Statistics come only from the candidates being ranked, so a bundle is a
+    function of the question and its search results and never depends on
+    what the node ranked before.
+    """
+
+    def __init__(self, docs: list[list[str]]):
+        self.n_docs = len(docs)
+        self.avg_length = sum(len(tokens) for tokens in docs) / self.n_docs if docs else 1.0
+        self.df = Counter(t for tokens in docs for t in set(tokens))
+
+    def idf(self, terms: list[str]) -> np.ndarray:
+        df = np.array([self.df[t] for t in terms], dtype=float)
+        return np.log1p((self.n_docs - df + 0.5) / (df + 0.5))
+
+
+# ── Ranking and selection ──────────────────────────────────────────
+
+def bm25_scores(question: str, docs: list[list[str]], corpus: CorpusStats | None = None) -> np.ndarray:
+    """BM25 score of each tokenized document against the question.
+
+    IDF and length normalization come from `corpus`, by default the documents themselves.
+    """
+    terms = sorted(set(tokenize(question)))
+    if not terms or not docs:
+        return np.zeros(len(docs))
+    corpus = corpus or CorpusStats(docs)
+    idf = corpus.idf(terms)
+    position = {t: i for i, t in enumerate(terms)}
+    tf = np.zeros((len(docs), len(terms)))
+    for d, tokens in enumerate(docs):
+        for t in tokens:
+            if t in position:
+                tf[d, position[t]] += 1
+    lengths = np.array([len(tokens) for tokens in docs], dtype=float)
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / corpus.avg_length)
+    return (tf * (BM25_K1 + 1) / (tf + norm[:, None]) * idf).sum(axis=1)
+
+
+def estimate_item_tokens(item: dict) -> int:
+    return math.ceil((len(item["snippet"]) + len(item["url"])) / CHARS_PER_TOKEN)
+
+
+def select_evidence(
+    question: str,
+    items: list[dict],
+    max_items: int = EVIDENCE_MAX_ITEMS,
+    token_budget: int = EVIDENCE_TOKEN_BUDGET,
+    relevance_weight: float = RANK_RELEVANCE_WEIGHT,
+) -> list[dict]:
+    """Pick the best evidence items for the question, best first.
+
+    Each candidate scores `relevance_weight` × BM25 relevance (scaled to the
+    best candidate) plus the rest × `score_quality`. BM25 statistics are
+    taken over the candidates alone, so the same question and search results
+    always select the same bundle. Items are taken in score order while they
+    fit `token_budget`, up to `max_items`; ties keep candidate order.
+    """
+    if not items:
+        return []
+    docs = [tokenize(item["snippet"]) for item in items]
+
+    relevance = bm25_scores(question, docs)
+    if relevance.max() > 0:
+        relevance = relevance / relevance.max()
+    quality = np.array(score_many([item["url"] for item in items]))
+    scores = relevance_weight * relevance + (1 - relevance_weight) * quality
+
+    selected: list[dict] = []
+    used = 0
+    for i in sorted(range(len(items)), key=lambda i: (-scores[i], i)):
+        cost = estimate_item_tokens(items[i])
+        if used + cost > token_budget and selected:
+            continue
+        selected.append(items[i])
+        used += cost
+        if len(selected) >= max_items:
+            break
+
+    logger.info(
+        "Selected %d of %d evidence items (~%d tokens of %d)",
+        len(selected), len(items), used, token_budget,
+    )
+    return selected
@@ -0,0 +1,163 @@
+"""Domain reputation index — suffix-hash lookup over large, memory-mapped reputation lists."""
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import logging
+import os
+import time
+from typing import Iterable
+from urllib.parse import urlparse
+
+import numpy as np
+
+from evidence.config import DOMAIN_REPUTATION_PATH, REPUTATION_RELOAD_S
+
+logger = logging.getLogger(__name__)
+
+# One record per domain, sorted by hash so lookups are a binary search of the mapped file
+RECORD = np.dtype([("hash", "<u8"), ("score", "<f8")])
+
+
+def domain_hash(domain: str) -> int:
+    return int.from_bytes(hashlib.blake2b(domain.encode(), digest_size=8).digest(), "little")
+
+
+def host_of(url: str) -> str:
+    """Lower-cased host of a URL without a leading `www.`; empty if unparseable."""
+    try:
+        host = (urlparse(url).hostname or "").lower()
+    except Exception:
+        return ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def suffixes(host: str) -> list[str]:
+    """`a.b.com` → [`a.b.com`, `b.com`, `com`], most specific first."""
+    labels = host.split(".")
+    return [".".join(labels[i:]) for i in range(len(labels))] if host else []
+
+
+def write_reputation_file(entries: Iterable[tuple[str, float]], path: str) -> int:
+    """Write (domain, score) pairs as a sorted `.npy` record array; returns the entry count.
+
+    Scores are clipped to 0-1 and a later duplicate of a domain replaces the
+    earlier one.
+    """
+    scores = {host_of(f"//{domain.strip()}"): min(1.0, max(0.0, float(score))) for domain, score in entries}
+    scores.pop("", None)
+    records = np.array([(domain_hash(d), s) for d, s in scores.items()], dtype=RECORD)
+    records.sort(order="hash")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp.npy"
+    np.save(tmp, records)
+    os.replace(tmp, path)   # atomic, so a running index reloads either the old or new file
+    return len(records)
+
+
+class ReputationIndex:
+    """Scores URLs by the most specific listed suffix of their host.
+
+    `overrides` (the built-in `DOMAIN_SCORES`) sit in a dict; the bulk list
+    is a sorted hash array memory-mapped from `path`, so opening a 100k+
+    domain list costs no parsing and lookups touch a few pages. A lookup
+    checks each suffix of the host, most specific first, so it takes
+    O(labels) probes. The file is re-mapped when its mtime changes, checked
+    at most every `reload_s` seconds.
+    """
+
+    def __init__(
+        self,
+        overrides: dict[str, float],
+        default: float,
+        path: str | None = DOMAIN_REPUTATION_PATH,
+        reload_s: float = REPUTATION_RELOAD_S,
+    ):
+        self.overrides = {domain_hash(d): s for d, s in overrides.items()}
+        self.default = default
+        self.path = path
+        self.reload_s = reload_s
+        self._hashes = np.zeros(0, dtype="<u8")
+        self._scores = np.zeros(0, dtype="<f8")
+        self._mtime: int | None = None
+        self._checked = 0.0
+        self.refresh(force=True)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def refresh(self, force: bool = False) -> bool:
+        """Re-map the reputation file if it changed; returns True if it was (re)loaded."""
+        now = time.monotonic()
+        if not self.path or (not force and now - self._checked < self.reload_s):
+            return False
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            records = np.load(self.path, mmap_mode="r")
+            self._hashes, self._scores = records["hash"], records["score"]
+        except Exception:
+            logger.exception("Could not load domain reputation file %s; keeping the previous list", self.path)
+            return False
+        self._mtime = mtime
+        logger.info("Loaded %d domain reputations from %s", len(self._hashes), self.path)
+        return True
+
+    def _lookup(self, hashes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(found, score) for each hash in the mapped list."""
+        if not len(self._hashes):
+            return np.zeros(len(hashes), dtype=bool), np.zeros(len(hashes), dtype="<f8")
+        pos = np.minimum(np.searchsorted(self._hashes, hashes), len(self._hashes) - 1)
+        return self._hashes[pos] == hashes, self._scores[pos]
+
+    def score(self, url: str) -> float:
+        return self.score_many([url])[0]
+
+    def score_many(self, urls: list[str]) -> list[float]:
+        """Quality scores (0-1) for many URLs with one vectorized search of the list."""
+        self.refresh()
+        candidates = [[domain_hash(s) for s in suffixes(host_of(url))] for url in urls]
+        flat = np.array([h for hashes in candidates for h in hashes], dtype="<u8")
+        found, listed = self._lookup(flat)
+
+        scores: list[float] = []
+        k = 0
+        for hashes in candidates:
+            score = self.default
+            for offset, h in enumerate(hashes):
+                if found[k + offset]:
+                    score = float(listed[k + offset])
+                    break
+                if h in self.overrides:
+                    score = self.overrides[h]
+                    break
+            scores.append(score)
+            k += len(hashes)
+        return scores
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the domain reputation file from a CSV of domain,score rows")
+    parser.add_argument("csv", help="input CSV: domain,score per line")
+    parser.add_argument("--out", default=DOMAIN_REPUTATION_PATH, help="output .npy file")
+    args = parser.parse_args()
+
+    rows: list[tuple[str, float]] = []
+    with open(args.csv, newline="") as f:
+        for row in csv.reader(f):
+            try:
+                rows.append((row[0], float(row[1])))
+            except (IndexError, ValueError):
+                continue  # header, comment or malformed line
+    count = write_reputation_file(rows, args.out)
+    print(f"Wrote {count} domains to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 """Quality scoring for evidence sources based on domain reputation."""
 from __future__ import annotations
 
-from urllib.parse import urlparse
+from evidence.reputation import ReputationIndex
 
 DOMAIN_SCORES: dict[str, float] = {
     "etherscan.io": 0.95,
@@ -29,21 +29,22 @@ DOMAIN_SCORES: dict[str, float] = {
 DEFAULT_SCORE = 0.3
 
 
+_index: ReputationIndex | None = None
+
+
+def get_reputation() -> ReputationIndex:
+    """Built-in scores plus the reputation list at `DOMAIN_REPUTATION_PATH`, hot-reloaded."""
+    global _index
+    if _index is None:
+        _index = ReputationIndex(DOMAIN_SCORES, DEFAULT_SCORE)
+    return _index
+
+
 def score_quality(url: str) -> float:
-    """Return a quality score (0-1) for a URL based on its domain."""
-    try:
-        host = urlparse(url).hostname or ""
-    except Exception:
-        return DEFAULT_SCORE
-
-    # Strip www. prefix
-    if host.startswith("www."):
-        host = host[4:]
-
-    # Check exact match first, then check if domain ends with a known suffix
-    if host in DOMAIN_SCORES:
-        return DOMAIN_SCORES[host]
-    for domain, score in DOMAIN_SCORES.items():
-        if host.endswith("." + domain) or host == domain:
-            return score
-    return DEFAULT_SCORE
+    """Return a quality score (0-1) for a URL based on its most specific listed domain."""
+    return get_reputation().score(url)
+
+
+def score_many(urls: list[str]) -> list[float]:
+    """`score_quality` for many URLs at once."""
+    return get_reputation().score_many(urls)
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 import math
-from collections import defaultdict
 
 import numpy as np
 
+from swarm.config import CI_METHOD
+from swarm.intervals import dirichlet_intervals
 from swarm.schemas import Ballot, ConvergenceSnapshot, Vote
 
 
@@ -12,24 +13,37 @@ from swarm.schemas import Ballot, ConvergenceSnapshot, Vote
 
 def compute_vote_counts(ballots: list[Ballot]) -> tuple[float, float, float]:
     """Count votes for each outcome (unweighted)."""
-    alpha_yes = sum(1 for b in ballots if b.vote == Vote.YES)
-    alpha_no = sum(1 for b in ballots if b.vote == Vote.NO)
-    alpha_null = sum(1 for b in ballots if b.vote == Vote.NULL)
-    return float(alpha_yes), float(alpha_no), float(alpha_null)
+    return AggregatorState.from_ballots(ballots).vote_counts()
 
 
 def dirichlet_posterior(
     ballots: list[Ballot],
     num_samples: int = 10_000,
+    method: str = CI_METHOD,
+    rng: np.random.Generator | None = None,
 ) -> tuple[tuple[float, float, float], dict[str, tuple[float, float]]]:
     """Compute Dirichlet posterior mean and 95% credible intervals.
 
+    method="exact" takes the 2.5/97.5% quantiles of each Beta marginal
+    (deterministic); method="sampling" draws `num_samples` Dirichlet samples
+    from `rng` (the global NumPy RNG if None) and takes percentiles.
+
     Returns:
         (posterior_mean, credible_intervals)
         posterior_mean: (p_yes, p_no, p_null)
         credible_intervals: {"YES": (lo, hi), "NO": (lo, hi), "NULL": (lo, hi)}
     """
-    alpha_yes, alpha_no, alpha_null = compute_vote_counts(ballots)
+    return dirichlet_posterior_from_counts(compute_vote_counts(ballots), num_samples, method, rng)
+
+
+def dirichlet_posterior_from_counts(
+    counts: tuple[float, float, float],
+    num_samples: int = 10_000,
+    method: str = CI_METHOD,
+    rng: np.random.Generator | None = None,
+) -> tuple[tuple[float, float, float], dict[str, tuple[float, float]]]:
+    """Same as `dirichlet_posterior`, from (yes, no, null) vote counts."""
+    alpha_yes, alpha_no, alpha_null = counts
 
     # Dirichlet prior: uniform (1, 1, 1)
     alpha = np.array([alpha_yes + 1, alpha_no + 1, alpha_null + 1])
@@ -38,12 +52,21 @@ def dirichlet_posterior(
     total = alpha.sum()
     posterior_mean = (alpha[0] / total, alpha[1] / total, alpha[2] / total)
 
-    # Sample from Dirichlet to get credible intervals
-    samples = np.random.dirichlet(alpha, size=num_samples)
+    if method == "exact":
+        # Each marginal is Beta(alpha_k, total - alpha_k)
+        lo, hi = dirichlet_intervals(alpha, level=0.95)
+    elif method == "sampling":
+        # Sample from Dirichlet to get credible intervals
+        sampler = rng.dirichlet if rng is not None else np.random.dirichlet
+        samples = sampler(alpha, size=num_samples)
+        lo, hi = np.percentile(samples, [2.5, 97.5], axis=0)
+    else:
+        raise ValueError(f"Unknown credible interval method: {method!r}")
+
     ci = {
-        "YES": (float(np.percentile(samples[:, 0], 2.5)), float(np.percentile(samples[:, 0], 97.5))),
-        "NO": (float(np.percentile(samples[:, 1], 2.5)), float(np.percentile(samples[:, 1], 97.5))),
-        "NULL": (float(np.percentile(samples[:, 2], 2.5)), float(np.percentile(samples[:, 2], 97.5))),
+        "YES": (float(lo[0]), float(hi[0])),
+        "NO": (float(lo[1]), float(hi[1])),
+        "NULL": (float(lo[2]), float(hi[2])),
     }
 
     return posterior_mean, ci
@@ -53,13 +76,7 @@ def dirichlet_posterior(
 
 def compute_distribution(ballots: list[Ballot]) -> tuple[float, float, float]:
     """Return (p_yes, p_no, p_null) from a list of ballots (unweighted)."""
-    if not ballots:
-        return (0.0, 0.0, 0.0)
-    total = len(ballots)
-    yes = sum(1 for b in ballots if b.vote == Vote.YES)
-    no = sum(1 for b in ballots if b.vote == Vote.NO)
-    null = sum(1 for b in ballots if b.vote == Vote.NULL)
-    return (yes / total, no / total, null / total)
+    return AggregatorState.from_ballots(ballots).distribution()
 
 
 # ── #3: KL Divergence ──────────────────────────────────────────────
@@ -84,52 +101,7 @@ def fleiss_kappa(ballots: list[Ballot]) -> float:
     Groups ballots by iteration. Each iteration is a 'subject' rated by
     the committee members.
     """
-    # Group ballots by iteration
-    by_iter: dict[int, list[Ballot]] = defaultdict(list)
-    for b in ballots:
-        by_iter[b.iteration].append(b)
-
-    if len(by_iter) < 2:
-        return 0.0
-
-    categories = [Vote.YES, Vote.NO, Vote.NULL]
-    n_subjects = len(by_iter)
-
-    # Build rating matrix: rows = iterations, cols = categories
-    matrix: list[list[int]] = []
-    for it in sorted(by_iter.keys()):
-        row = [sum(1 for b in by_iter[it] if b.vote == cat) for cat in categories]
-        matrix.append(row)
-
-    # Number of raters per subject (may vary if some calls failed)
-    ns = [sum(row) for row in matrix]
-
-    # Filter out subjects with < 2 raters
-    valid = [(row, n) for row, n in zip(matrix, ns) if n >= 2]
-    if len(valid) < 2:
-        return 0.0
-
-    matrix_v = [row for row, _ in valid]
-    ns_v = [n for _, n in valid]
-    n_subjects_v = len(valid)
-
-    # P_observed: mean pairwise agreement
-    p_observed = 0.0
-    for row, n in zip(matrix_v, ns_v):
-        p_observed += (sum(r * r for r in row) - n) / (n * (n - 1))
-    p_observed /= n_subjects_v
-
-    # P_expected: chance agreement from marginal proportions
-    total_ratings = sum(ns_v)
-    p_expected = 0.0
-    for j in range(len(categories)):
-        pj = sum(row[j] for row in matrix_v) / total_ratings
-        p_expected += pj * pj
-
-    if abs(1 - p_expected) < 1e-10:
-        return 1.0  # perfect agreement
-
-    return (p_observed - p_expected) / (1 - p_expected)
+    return AggregatorState.from_ballots(ballots).fleiss_kappa()
 
 
 # ── #6: Effective Sample Size ──────────────────────────────────────
@@ -140,42 +112,7 @@ def effective_sample_size(ballots: list[Ballot]) -> float:
     Uses the design effect formula: n_eff = n / (1 + (avg_cluster - 1) * rho)
     where rho is estimated from within-cluster vote agreement.
     """
-    if not ballots:
-        return 0.0
-
-    n = len(ballots)
-
-    # Group by model
-    by_model: dict[str, list[Ballot]] = defaultdict(list)
-    for b in ballots:
-        by_model[b.model].append(b)
-
-    if len(by_model) >= n:
-        return float(n)  # each ballot from different model, no correlation
-
-    # Average cluster size
-    avg_cluster = n / len(by_model)
-
-    # Estimate within-model correlation (rho) from vote agreement
-    # For each model group, compute proportion of most-common vote
-    agreements = []
-    for model_ballots in by_model.values():
-        if len(model_ballots) < 2:
-            continue
-        votes = [b.vote for b in model_ballots]
-        most_common = max(set(votes), key=votes.count)
-        agreement = votes.count(most_common) / len(votes)
-        agreements.append(agreement)
-
-    if not agreements:
-        return float(n)
-
-    # rho: excess agreement above chance (baseline 1/3 for 3 categories)
-    mean_agreement = sum(agreements) / len(agreements)
-    rho = max(0.0, (mean_agreement - 1 / 3) / (1 - 1 / 3))
-
-    deff = 1 + (avg_cluster - 1) * rho
-    return n / deff
+    return AggregatorState.from_ballots(ballots).effective_sample_size()
 
 
 # ── Entropy ────────────────────────────────────────────────────────
@@ -193,10 +130,190 @@ def compute_entropy(p_yes: float, p_no: float, p_null: float) -> float:
 
 def convergence_snapshot(iteration: int, ballots: list[Ballot]) -> ConvergenceSnapshot:
     """Create a convergence snapshot from all ballots so far."""
-    p_yes, p_no, p_null = compute_distribution(ballots)
-    return ConvergenceSnapshot(
-        iteration=iteration,
-        p_yes=round(p_yes, 4),
-        p_no=round(p_no, 4),
-        p_null=round(p_null, 4),
-    )
+    return AggregatorState.from_ballots(ballots).snapshot(iteration)
+
+
+# ── Incremental aggregation ────────────────────────────────────────
+
+_CATEGORY_INDEX = {Vote.YES: 0, Vote.NO: 1, Vote.NULL: 2}
+
+
+def _pairwise_agreement(row: list[int], n: int) -> float:
+    """Fleiss' per-subject agreement for a row of category counts with n raters."""
+    return (sum(r * r for r in row) - n) / (n * (n - 1))
+
+
+class AggregatorState:
+    """Running sufficient statistics over a stream of ballots.
+
+    Ballots are added one at a time; every query below is answered from the
+    running counts in O(categories) instead of rescanning all ballots. Kappa
+    keeps one category row per iteration, n_eff one vote histogram per model,
+    and both keep their sums up to date as rows change.
+
+    With archetype `weights` (a stratified design), `distribution` and
+    `vote_counts` report the post-stratified estimate instead of pooled
+    shares, so snapshots, the posterior and stopping rules all use it.
+    """
+
+    def __init__(self, weights: dict[str, float] | None = None) -> None:
+        self.weights = weights
+        self.ballots: list[Ballot] = []
+        self.counts = [0, 0, 0]
+        self._iteration_rows: dict[int, list[int]] = {}
+        self._model_rows: dict[str, list[int]] = {}
+        self._archetype_rows: dict[str, list[int]] = {}
+
+        # Fleiss' kappa sums over iterations with >= 2 raters
+        self._kappa_subjects = 0
+        self._kappa_agreement = 0.0
+        self._kappa_columns = [0, 0, 0]
+
+        # n_eff sums over models with >= 2 ballots
+        self._agreement_models = 0
+        self._agreement_sum = 0.0
+
+    @classmethod
+    def from_ballots(cls, ballots: list[Ballot]) -> AggregatorState:
+        state = cls()
+        for ballot in ballots:
+            state.add(ballot)
+        return state
+
+    @property
+    def n(self) -> int:
+        return len(self.ballots)
+
+    def add(self, ballot: Ballot) -> None:
+        """Fold one ballot into the running statistics."""
+        k = _CATEGORY_INDEX[ballot.vote]
+        self.ballots.append(ballot)
+        self.counts[k] += 1
+
+        self._archetype_rows.setdefault(ballot.archetype, [0, 0, 0])[k] += 1
+
+        row = self._iteration_rows.setdefault(ballot.iteration, [0, 0, 0])
+        n = sum(row)
+        if n >= 2:
+            self._kappa_subjects -= 1
+            self._kappa_agreement -= _pairwise_agreement(row, n)
+        row[k] += 1
+        n += 1
+        if n >= 2:
+            self._kappa_subjects += 1
+            self._kappa_agreement += _pairwise_agreement(row, n)
+            # A row joining the valid set brings all its ratings into the marginals
+            if n == 2:
+                for j in range(3):
+                    self._kappa_columns[j] += row[j]
+            else:
+                self._kappa_columns[k] += 1
+
+        hist = self._model_rows.setdefault(ballot.model, [0, 0, 0])
+        m = sum(hist)
+        if m >= 2:
+            self._agreement_models -= 1
+            self._agreement_sum -= max(hist) / m
+        hist[k] += 1
+        m += 1
+        if m >= 2:
+            self._agreement_models += 1
+            self._agreement_sum += max(hist) / m
+
+    def extend(self, ballots: list[Ballot]) -> None:
+        for ballot in ballots:
+            self.add(ballot)
+
+    def vote_counts(self) -> tuple[float, float, float]:
+        """Votes per outcome as (yes, no, null).
+
+        Under stratification these are pseudo-counts: the post-stratified
+        shares scaled to the number of ballots.
+        """
+        if self.weights is not None:
+            p_yes, p_no, p_null = self.stratified_distribution(self.weights)
+            return p_yes * self.n, p_no * self.n, p_null * self.n
+        return float(self.counts[0]), float(self.counts[1]), float(self.counts[2])
+
+    def pooled_distribution(self) -> tuple[float, float, float]:
+        """Pooled (p_yes, p_no, p_null) over all ballots, ignoring any weights."""
+        total = self.n
+        if not total:
+            return (0.0, 0.0, 0.0)
+        return (self.counts[0] / total, self.counts[1] / total, self.counts[2] / total)
+
+    def distribution(self) -> tuple[float, float, float]:
+        """Empirical (p_yes, p_no, p_null), post-stratified if weighted; zeros before the first ballot."""
+        if self.weights is not None:
+            return self.stratified_distribution(self.weights)
+        return self.pooled_distribution()
+
+    def stratified_distribution(self, weights: dict[str, float]) -> tuple[float, float, float]:
+        """Post-stratified (p_yes, p_no, p_null): per-archetype vote shares averaged
+        with the target archetype `weights`, renormalized over archetypes seen so far.
+
+        Unlike the pooled shares this does not depend on how many seats each
+        archetype happened to get, which is what a stratified design controls.
+        """
+        observed = {a: w for a, w in weights.items() if w > 0 and a in self._archetype_rows}
+        total_weight = sum(observed.values())
+        if not total_weight:
+            return (0.0, 0.0, 0.0)
+        p = [0.0, 0.0, 0.0]
+        for archetype, w in observed.items():
+            row = self._archetype_rows[archetype]
+            n = sum(row)
+            for k in range(3):
+                p[k] += w / total_weight * row[k] / n
+        return (p[0], p[1], p[2])
+
+    def snapshot(self, iteration: int) -> ConvergenceSnapshot:
+        p_yes, p_no, p_null = self.distribution()
+        return ConvergenceSnapshot(
+            iteration=iteration,
+            p_yes=round(p_yes, 4),
+            p_no=round(p_no, 4),
+            p_null=round(p_null, 4),
+        )
+
+    def posterior(
+        self,
+        num_samples: int = 10_000,
+        method: str = CI_METHOD,
+        rng: np.random.Generator | None = None,
+    ) -> tuple[tuple[float, float, float], dict[str, tuple[float, float]]]:
+        """Dirichlet posterior mean and 95% credible intervals (see `dirichlet_posterior`)."""
+        return dirichlet_posterior_from_counts(self.vote_counts(), num_samples, method, rng)
+
+    def fleiss_kappa(self) -> float:
+        """Fleiss' kappa with iterations as subjects (see `fleiss_kappa`)."""
+        if len(self._iteration_rows) < 2 or self._kappa_subjects < 2:
+            return 0.0
+
+        p_observed = self._kappa_agreement / self._kappa_subjects
+        total_ratings = sum(self._kappa_columns)
+        p_expected = sum((c / total_ratings) ** 2 for c in self._kappa_columns)
+
+        if abs(1 - p_expected) < 1e-10:
+            return 1.0  # perfect agreement
+
+        return (p_observed - p_expected) / (1 - p_expected)
+
+    def effective_sample_size(self) -> float:
+        """Design-effect n_eff over model clusters (see `effective_sample_size`)."""
+        n = self.n
+        if not n:
+            return 0.0
+        if len(self._model_rows) >= n:
+            return float(n)  # each ballot from different model, no correlation
+        if not self._agreement_models:
+            return float(n)
+
+        avg_cluster = n / len(self._model_rows)
+
+        # rho: excess agreement above chance (baseline 1/3 for 3 categories)
+        mean_agreement = self._agreement_sum / self._agreement_models
+        rho = max(0.0, (mean_agreement - 1 / 3) / (1 - 1 / 3))
+
+        deff = 1 + (avg_cluster - 1) * rho
+        return n / deff
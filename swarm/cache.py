@@ -0,0 +1,294 @@
+"""Content-addressed LLM response cache with record and replay."""
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+
+from swarm.config import LLM_CACHE_MAX_BYTES, LLM_CACHE_MODE, LLM_CACHE_PATH, TEMPERATURE
+from swarm.models import CompletionRequest, LLMProvider, LLMResponse
+from swarm.schemas import EvidenceBundle
+
+logger = logging.getLogger(__name__)
+
+CACHE_MODES = ("off", "read", "replay")
+
+
+class CacheMissError(RuntimeError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+# ── On-disk store ──────────────────────────────────────────────────
+
+class SqliteLRUStore:
+    """Persistent key → bytes store in SQLite, evicting least recently used
+    entries once the stored values exceed `max_bytes`. Entries may carry a
+    TTL, after which they read as missing and are evicted first."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL, expires_at REAL)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(entries)")}
+        if "expires_at" not in columns:  # stores created before TTL support
+            self._db.execute("ALTER TABLE entries ADD COLUMN expires_at REAL")
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, size, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, size, expires_at = row
+            now = time.time()
+            if expires_at is not None and expires_at <= now:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._total -= size
+                return None
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            return value
+
+    def put(self, key: str, value: bytes, ttl_s: float | None = None) -> None:
+        with self._lock:
+            now = time.time()
+            old = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access, expires_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now + ttl_s if ttl_s is not None else None),
+            )
+            self._total += len(value) - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop expired entries, then the oldest ones, until the store is under 90% of its cap."""
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for key, size in self._db.execute(
+            "SELECT key, size FROM entries"
+            " ORDER BY expires_at IS NULL OR expires_at > ?, last_access",
+            (time.time(),),
+        ).fetchall():
+            if self._total <= target:
+                break
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._total -= size
+            evicted += 1
+        logger.info("Evicted %d cache entries from %s", evicted, self.path)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+_stores: dict[str, SqliteLRUStore] = {}
+
+
+def get_store(path: str = LLM_CACHE_PATH, max_bytes: int = LLM_CACHE_MAX_BYTES) -> SqliteLRUStore:
+    """Return the process-wide store for `path`, opening it on first use."""
+    if path not in _stores:
+        _stores[path] = SqliteLRUStore(path, max_bytes)
+    return _stores[path]
+
+
+# ── Caching provider ───────────────────────────────────────────────
+
+def response_key(model: str, system: str, user: str, temperature: float, sample_index: int) -> str:
+    """Content address of one completion request."""
+    payload = json.dumps([model, system, user, temperature, sample_index], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CachingProvider(LLMProvider):
+    """Wraps a provider with the response cache.
+
+    Repeated identical prompts are told apart by a sample index: the k-th
+    call with the same (model, system, user, temperature) in this wrapper's
+    lifetime uses index k. A response claims its index only when it arrives,
+    so retries and cancelled hedges leave no gaps. Wrap providers once
+    per run so a replayed run asks for exactly the responses the recorded
+    run stored.
+
+    Modes: "read" serves hits and records misses; "replay" serves hits and
+    raises `CacheMissError` on a miss, without touching the network.
+    """
+
+    def __init__(self, inner: LLMProvider, mode: str = "read", store: SqliteLRUStore | None = None):
+        if mode not in ("read", "replay"):
+            raise ValueError(f"CachingProvider mode must be 'read' or 'replay', got {mode!r}")
+        self.inner = inner
+        self.mode = mode
+        self.store = store if store is not None else get_store()
+        self._sample_counts: dict[str, int] = defaultdict(int)
+        self._free: dict[str, list[int]] = defaultdict(list)   # min-heaps of unclaimed indices
+
+    @property
+    def model_id(self) -> str:
+        return self.inner.model_id
+
+    @property
+    def key(self) -> str:
+        return self.inner.key
+
+    def _take(self, prompt_key: str, n: int) -> list[int]:
+        """The n lowest sample indices of this prompt not yet served or stored."""
+        free = self._free[prompt_key]
+        indices = [heapq.heappop(free) for _ in range(min(n, len(free)))]
+        first = self._sample_counts[prompt_key]
+        self._sample_counts[prompt_key] += n - len(indices)
+        return indices + list(range(first, first + n - len(indices)))
+
+    @property
+    def supports_batch(self) -> bool:
+        return self.inner.supports_batch
+
+    def _lookup(self, system: str, user: str, temperature: float, n: int) -> tuple[str, list[dict | None]]:
+        """Reserve n sample indices and return the prompt key and their cached entries (None = miss)."""
+        prompt_key = response_key(self.model_id, system, user, temperature, -1)
+        indices = self._take(prompt_key, n)
+        keys = [response_key(self.model_id, system, user, temperature, i) for i in indices]
+
+        # Each of the n choices is stored under its own sample index
+        found = [self.store.get(key) for key in keys]
+        missing = [k for k, cached in enumerate(found) if cached is None]
+        entries = [json.loads(cached) if cached is not None else None for cached in found]
+        if missing and self.mode == "replay":
+            raise CacheMissError(
+                f"No recorded response for {self.model_id} "
+                f"(samples {[indices[k] for k in missing]}, key {keys[missing[0]][:12]})"
+            )
+
+        # Missed indices go back to the pool and are only claimed once a
+        # response arrives, so failed, timed-out or cancelled (hedged)
+        # requests leave no gaps in the recorded samples
+        for k in missing:
+            heapq.heappush(self._free[prompt_key], indices[k])
+        return prompt_key, entries
+
+    def _record(
+        self, prompt_key: str, request: CompletionRequest, entries: list[dict | None], response: LLMResponse,
+    ) -> None:
+        """Fill the missing entries from `response` and store them under newly claimed indices."""
+        missing = [k for k, entry in enumerate(entries) if entry is None]
+        claimed = self._take(prompt_key, min(len(missing), len(response.choices)))
+        for k, index, content in zip(missing, claimed, response.choices):
+            entries[k] = {"content": content, "model": response.model}
+            key = response_key(self.model_id, request.system, request.user, request.temperature, index)
+            self.store.put(key, json.dumps(entries[k]).encode())
+
+    @staticmethod
+    def _served(entries: list[dict | None], response: LLMResponse | None) -> LLMResponse:
+        # Only a request that reached the provider has token usage to report
+        served = [e for e in entries if e is not None]
+        return LLMResponse(
+            content=served[0]["content"],
+            model=served[0]["model"],
+            choices=[e["content"] for e in served],
+            prompt_tokens=response.prompt_tokens if response is not None else None,
+            cached_tokens=response.cached_tokens if response is not None else None,
+        )
+
+    async def complete(
+        self, system: str, user: str, temperature: float = TEMPERATURE, n: int = 1,
+    ) -> LLMResponse:
+        prompt_key, entries = self._lookup(system, user, temperature, n)
+        missing = sum(entry is None for entry in entries)
+        response = None
+        if missing:
+            request = CompletionRequest(system, user, temperature, missing)
+            response = await self.inner.complete(system=system, user=user, temperature=temperature, n=missing)
+            self._record(prompt_key, request, entries, response)
+        return self._served(entries, response)
+
+    async def complete_batch(
+        self, requests: list[CompletionRequest], timeout_s: float | None = None,
+    ) -> list[LLMResponse | Exception]:
+        """Serve cached samples and send only the misses on to the inner provider's batch."""
+        results: list[LLMResponse | Exception] = [None] * len(requests)
+        pending: list[tuple[int, str, list[dict | None], CompletionRequest]] = []
+        for k, r in enumerate(requests):
+            try:
+                prompt_key, entries = self._lookup(r.system, r.user, r.temperature, r.n)
+            except CacheMissError as exc:
+                results[k] = exc
+                continue
+            missing = sum(entry is None for entry in entries)
+            if missing:
+                pending.append((k, prompt_key, entries, CompletionRequest(r.system, r.user, r.temperature, missing)))
+            else:
+                results[k] = self._served(entries, None)
+
+        if pending:
+            responses = await self.inner.complete_batch([request for *_, request in pending], timeout_s)
+            for (k, prompt_key, entries, request), response in zip(pending, responses):
+                if isinstance(response, BaseException):
+                    results[k] = response
+                    continue
+                self._record(prompt_key, request, entries, response)
+                results[k] = self._served(entries, response)
+        return results
+
+
+def with_response_cache(providers: list[LLMProvider], mode: str = LLM_CACHE_MODE) -> list[LLMProvider]:
+    """Wrap providers for one run according to `mode` ("off", "read" or "replay")."""
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unknown LLM cache mode {mode!r}; choose from {CACHE_MODES}")
+    if mode == "off":
+        return providers
+    return [CachingProvider(p, mode) for p in providers]
+
+
+# ── Run recordings ─────────────────────────────────────────────────
+
+@dataclass
+class RunRecording:
+    """What a replay needs besides the responses: the prompt's date and the committee seed."""
+
+    today: str
+    sampler_seed: int
+
+
+def recording_key(bundle: EvidenceBundle) -> str:
+    """Store key of the recording for runs over `bundle`."""
+    payload = json.dumps(["run", bundle.model_dump(mode="json")], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def load_recording(bundle: EvidenceBundle, mode: str, store: SqliteLRUStore | None = None) -> RunRecording | None:
+    """The recorded date and seed of `bundle`'s run, if any.
+
+    Response keys cover the whole prompt, date included, so a run only
+    replays if it renders the recorded date and samples the recorded
+    committees. A missing recording is an error in "replay" mode.
+    """
+    if mode == "off":
+        return None
+    raw = (store if store is not None else get_store()).get(recording_key(bundle))
+    if raw is None:
+        if mode == "replay":
+            raise CacheMissError(f"No recorded run for bundle {bundle.merkle_root[:18]}")
+        return None
+    return RunRecording(**json.loads(raw))
+
+
+def save_recording(bundle: EvidenceBundle, recording: RunRecording, store: SqliteLRUStore | None = None) -> None:
+    (store if store is not None else get_store()).put(recording_key(bundle), json.dumps(asdict(recording)).encode())
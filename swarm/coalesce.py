@@ -0,0 +1,147 @@
+"""Request coalescing — identical concurrent swarm runs share one run; finished runs are cached."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Callable
+
+from swarm.config import VERDICT_CACHE_SIZE, VERDICT_CACHE_TTL_S
+from swarm.schemas import EvidenceBundle
+
+logger = logging.getLogger(__name__)
+
+Event = tuple[str, dict]
+
+
+def run_key(bundle: EvidenceBundle, **params) -> str:
+    """Identity of a swarm run: the bundle's Merkle root plus the run parameters.
+
+    The root is whatever the client sent and is not re-derived here, so the
+    key also covers a digest of the bundle itself; two different bundles
+    claiming the same root never share a run.
+    """
+    payload = json.dumps([bundle.merkle_root, bundle.model_dump(mode="json"), params], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class _Flight:
+    """One in-flight run and the events it has produced so far."""
+
+    def __init__(self):
+        self.events: list[Event] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.subscribers = 0
+        self.task: asyncio.Task | None = None
+        self._wake = asyncio.Event()
+
+    def publish(self) -> None:
+        self._wake.set()
+        self._wake = asyncio.Event()
+
+
+class RunCoalescer:
+    """Singleflight for swarm runs, plus a TTL/LRU cache of finished ones.
+
+    The first request for a key starts the run; concurrent requests for the
+    same key subscribe to it and replay its events from the start, so every
+    subscriber sees the whole snapshot stream and the same verdict. Side
+    effects in the run (posting on-chain) therefore happen once. A finished
+    run's events are cached for `ttl_s` (at most `max_entries` runs) and
+    replayed without running the swarm again. If every subscriber leaves,
+    the run is cancelled and nothing is cached.
+    """
+
+    def __init__(self, ttl_s: float = VERDICT_CACHE_TTL_S, max_entries: int = VERDICT_CACHE_SIZE):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._flights: dict[str, _Flight] = {}
+        self._finished: OrderedDict[str, tuple[float, list[Event]]] = OrderedDict()
+        self.runs = 0
+        self.joined = 0
+        self.cache_hits = 0
+
+    def cached(self, key: str) -> list[Event] | None:
+        entry = self._finished.get(key)
+        if entry is None:
+            return None
+        expires_at, events = entry
+        if expires_at <= time.monotonic():
+            del self._finished[key]
+            return None
+        self._finished.move_to_end(key)
+        return events
+
+    async def stream(self, key: str, source: Callable[[], AsyncIterator[Event]]) -> AsyncIterator[Event]:
+        """Events of the run `key`, started from `source()` only if nothing can be shared."""
+        events = self.cached(key)
+        if events is not None:
+            self.cache_hits += 1
+            logger.info("Serving swarm run %s from the verdict cache", key[:12])
+            for event in events:
+                yield event
+            return
+
+        flight = self._flights.get(key)
+        if flight is None:
+            self.runs += 1
+            flight = self._flights[key] = _Flight()
+            flight.task = asyncio.create_task(self._fly(key, flight, source))
+        else:
+            self.joined += 1
+            logger.info("Joining in-flight swarm run %s (%d subscribers)", key[:12], flight.subscribers + 1)
+
+        flight.subscribers += 1
+        try:
+            seen = 0
+            while True:
+                wake = flight._wake
+                while seen < len(flight.events):
+                    yield flight.events[seen]
+                    seen += 1
+                if flight.done:
+                    break
+                await wake.wait()
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            flight.subscribers -= 1
+            if not flight.subscribers and not flight.done:
+                # Everyone left; stop paying for the run and let the next request start afresh
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+
+    async def _fly(self, key: str, flight: _Flight, source: Callable[[], AsyncIterator[Event]]) -> None:
+        try:
+            async for event in source():
+                flight.events.append(event)
+                flight.publish()
+        except asyncio.CancelledError:
+            flight.error = RuntimeError("swarm run cancelled")
+        except Exception as e:
+            logger.exception("Swarm run %s failed", key[:12])
+            flight.error = e
+        else:
+            if flight.events and flight.events[-1][0] == "verdict":
+                self._finished[key] = (time.monotonic() + self.ttl_s, flight.events)
+                while len(self._finished) > self.max_entries:
+                    self._finished.popitem(last=False)
+        finally:
+            flight.done = True
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.publish()
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "joined": self.joined,
+            "cache_hits": self.cache_hits,
+            "in_flight": len(self._flights),
+            "cached": len(self._finished),
+        }
@@ -1,3 +1,6 @@
+import json
+import os
+
 NUM_ITERATIONS = 10
 COMMITTEE_SIZE = 3
 TEMPERATURE = 0.8
@@ -5,3 +8,58 @@ MODEL = "gpt-4o-mini"
 CONVERGENCE_THRESHOLD = 0.01  # KL divergence threshold for early stopping
 CONVERGENCE_PATIENCE = 2      # consecutive iterations below threshold to stop
 MIN_BALLOTS_FOR_CONVERGENCE = 15  # don't check convergence until this many ballots
+MAX_IN_FLIGHT: int | None = None  # None = lockstep iterations; N = pipelined window of N concurrent calls
+COMPLETIONS_PER_REQUEST = 1  # >1: one request asks for n completions, filling n iterations for that seat
+CI_METHOD = "exact"  # "exact" (Beta-marginal quantiles) or "sampling" (10k Dirichlet draws)
+STOPPING_POLICY = "kl"       # "kl", "ci_width", "sprt", "stable" or "none" (see swarm/stopping.py)
+CI_WIDTH_TARGET = 0.2        # ci_width: stop when every 95% CI is at most this wide
+SPRT_CONFIDENCE = 0.95       # sprt/stable: posterior probability required to stop
+STABLE_PATIENCE = 3          # stable: iterations the leading outcome must hold
+SAMPLER = "random"           # "random" (independent committees) or "stratified" (balanced rotation)
+SAMPLER_SEED: int | None = None  # fixes the committee schedule for reproducible runs (models too, unless ROUTING = "adaptive")
+ARCHETYPE_WEIGHTS: dict[str, float] | None = None  # stratified target shares by archetype name (uniform if None)
+STRATIFIED_ESTIMATE = True   # stratified sampler: snapshots, posterior, CIs and stopping use the post-stratified estimate
+LLM_CACHE_MODE = os.environ.get("LLM_CACHE_MODE", "off")  # "off", "read" (read-through) or "replay" (miss = error)
+LLM_CACHE_PATH = "cache/llm_responses.sqlite"
+LLM_CACHE_MAX_BYTES = 256 * 1024 * 1024  # LRU eviction above this many bytes of responses
+CALL_TIMEOUT_S: float | None = 60.0  # deadline per provider request attempt (None = wait forever)
+CALL_MAX_RETRIES = 2         # retries per call after a timeout or error
+RETRY_BACKOFF_S = 0.5        # base of the exponential backoff; each wait is drawn uniformly up to the cap
+RETRY_BACKOFF_MAX_S = 8.0
+RETRY_BUDGET = 20            # retries allowed per run across all calls
+HEDGE_PERCENTILE: float | None = None  # e.g. 0.95: duplicate a request still pending past this latency quantile
+HEDGE_MIN_SAMPLES = 20       # recent latencies needed before hedging starts
+LATENCY_WINDOW = 200         # recent call latencies kept for the hedge quantile
+RATE_LIMITS: dict[str, tuple[float, float]] = {}  # "provider:model" -> (requests/min, tokens/min)
+DEFAULT_RATE_LIMIT = (500.0, 200_000.0)  # limits for keys not listed in RATE_LIMITS
+RATE_LIMIT_BURST_S = 10.0    # bucket capacity, in seconds of refill
+CHARS_PER_TOKEN = 4          # prompt-length heuristic for token estimates
+OUTPUT_TOKENS_ESTIMATE = 300  # expected completion tokens per choice, charged up front
+HTTP_MAX_CONNECTIONS = 100   # pooled connections shared by all LLM clients
+HTTP_MAX_KEEPALIVE = 20      # idle connections kept open for reuse
+HTTP_KEEPALIVE_EXPIRY_S = 60.0
+HTTP_TIMEOUT_S = 120.0       # read timeout for one LLM HTTP request
+HTTP2 = True                 # negotiate HTTP/2 when the optional `h2` package is installed
+ROUTING = "uniform"          # provider choice per seat: "uniform" or "adaptive" (swarm/routing.py; not reproduced by SAMPLER_SEED)
+ROUTER_MIN_MODELS = 2        # adaptive: distinct models per committee, when the pool has them
+ROUTER_EXPLORE = 0.1         # adaptive: share of seats assigned uniformly at random
+ROUTER_COST_WEIGHT = 1000.0  # adaptive: seconds of latency one USD is worth
+ROUTER_UCB_C = 0.5           # adaptive: optimism bonus for rarely used providers
+ROUTER_EWMA_ALPHA = 0.1      # adaptive: weight of the newest observation in provider statistics
+MODEL_PRICES: dict[str, tuple[float, float, float]] = {
+    # USD per 1M tokens: input, cached input, output
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+}
+# OpenAI-compatible backends (vLLM, llama.cpp, ...) as a JSON list, e.g.
+# [{"name": "local", "base_url": "http://localhost:8000/v1", "model": "llama-3.1-8b", "max_batch": 64}]
+# Optional per backend: "api_key_env", "rpm", "tpm" (no rate limiting if both are absent), and
+# "prompt_template" ("{system}"/"{user}" in the model's chat format) to allow batched submission
+LLM_BACKENDS: list[dict] = json.loads(os.environ.get("LLM_BACKENDS", "[]"))
+BATCH_SUBMIT = False         # lockstep only: send each block's calls to backends with a prompt_template as multi-prompt requests; an error with MAX_IN_FLIGHT
+JOB_WORKERS = 4              # background swarm jobs run at once
+JOB_QUEUE_MAX = 100          # jobs waiting beyond this are rejected with 503
+JOBS_DB_PATH = "cache/jobs.sqlite"
+JOB_RETENTION_S = 7 * 24 * 3600  # finished jobs and their event logs are pruned after this
+VERDICT_CACHE_TTL_S = 600.0  # identical swarm runs (same bundle and parameters) within this window reuse the verdict
+VERDICT_CACHE_SIZE = 256     # finished runs kept for reuse, least recently used evicted first
@@ -1,34 +1,82 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import random
 import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 
 from swarm.archetypes import Archetype
-from swarm.models import LLMProvider
-from swarm.schemas import Ballot, EvidenceBundle, Vote
+from swarm.cache import CacheMissError
+from swarm.config import (
+    CALL_MAX_RETRIES,
+    CALL_TIMEOUT_S,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_PERCENTILE,
+    LATENCY_WINDOW,
+    RETRY_BACKOFF_MAX_S,
+    RETRY_BACKOFF_S,
+    RETRY_BUDGET,
+)
+from swarm.models import CompletionRequest, LLMProvider, LLMResponse
+from swarm.ratelimit import request_priority
+from swarm.routing import ProviderRouter, get_router, request_cost
+from swarm.schemas import Ballot, CallStats, EvidenceBundle, Vote
 
 logger = logging.getLogger(__name__)
 
 
-def _build_user_prompt(bundle: EvidenceBundle) -> str:
-    from datetime import datetime, timezone
+@dataclass
+class BundlePrompt:
+    """An evidence bundle rendered once per run, laid out for prefix caching.
 
+    `shared` (question, rubric and evidence) is the system message and is
+    byte-identical for every archetype, so providers that cache prompt
+    prefixes reuse it across the whole committee. The archetype instructions
+    and today's date follow in the user message.
+    """
+
+    shared: str
+    today: str
+    _user: dict[str, str] = field(default_factory=dict, repr=False)
+
+    def user_message(self, archetype: Archetype) -> str:
+        if archetype.name not in self._user:
+            self._user[archetype.name] = (
+                f"{archetype.system_prompt}\n"
+                f"TODAY'S DATE: {self.today}\n\n"
+                "Evaluate the question using ONLY the evidence above. "
+                "Respond with a single JSON object and nothing else."
+            )
+        return self._user[archetype.name]
+
+
+def render_bundle_prompt(bundle: EvidenceBundle, today: str | None = None) -> BundlePrompt:
+    """Render the shared question/rubric/evidence block for one run.
+
+    `today` (YYYY-MM-DD) pins the date in the prompt; a replayed run passes
+    the recorded one. Defaults to the current UTC date.
+    """
     evidence_block = "\n".join(
         f"[Evidence {e.id}] {e.snippet} — source: {e.url} ({e.timestamp})"
         for e in bundle.evidence
     )
     rubric_block = ", ".join(bundle.rubric)
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    today = today or datetime.now(timezone.utc).strftime("%Y-%m-%d")
 
-    return (
-        f"TODAY'S DATE: {today}\n\n"
+    shared = (
+        "You are one member of a committee of evaluators judging a question "
+        "against a fixed evidence bundle. Your evaluator role and the required "
+        "output format are given after the evidence.\n\n"
         f"QUESTION: {bundle.question}\n\n"
         f"EVALUATION RUBRIC: {rubric_block}\n\n"
-        f"EVIDENCE BUNDLE:\n{evidence_block}\n\n"
-        "Evaluate the question using ONLY the evidence above. "
-        "Respond with a single JSON object and nothing else."
+        f"EVIDENCE BUNDLE:\n{evidence_block}"
     )
+    return BundlePrompt(shared=shared, today=today)
 
 
 def _sanitize_json(raw: str) -> str:
@@ -68,33 +116,22 @@ def _extract_json(text: str) -> dict:
         return json.loads(_sanitize_json(raw))
 
 
-async def evaluate(
+def _parse_ballot(
+    content: str,
     archetype: Archetype,
     provider: LLMProvider,
-    bundle: EvidenceBundle,
+    model: str,
     iteration: int,
 ) -> Ballot | None:
-    """Run a single evaluator agent and return a parsed Ballot, or None on failure."""
-    user_prompt = _build_user_prompt(bundle)
-
-    try:
-        response = await provider.complete(
-            system=archetype.system_prompt,
-            user=user_prompt,
-            temperature=0.8,
-        )
-    except Exception:
-        logger.exception("LLM call failed for %s on %s", archetype.name, provider.model_id)
-        return None
-
+    """Parse one completion into a Ballot, or None if it is unusable."""
     try:
-        data = _extract_json(response.content)
+        data = _extract_json(content)
     except (json.JSONDecodeError, ValueError):
         logger.error(
             "Failed to parse JSON from %s (%s). Raw output:\n%s",
             archetype.name,
             provider.model_id,
-            response.content,
+            content,
         )
         return None
 
@@ -102,7 +139,7 @@ async def evaluate(
         return Ballot(
             iteration=iteration,
             archetype=archetype.name,
-            model=response.model,
+            model=model,
             vote=Vote(data["vote"]),
             supporting_evidence_ids=data.get("supporting_evidence_ids", []),
             refuting_evidence_ids=data.get("refuting_evidence_ids", []),
@@ -117,3 +154,273 @@ async def evaluate(
             data,
         )
         return None
+
+
+# ── Deadlines, retries and hedging ─────────────────────────────────
+
+class CallPolicy:
+    """Per-run rules for provider requests, collecting the run's `CallStats`.
+
+    Each attempt gets `timeout_s`. A failed or timed-out attempt is retried
+    up to `max_retries` times with exponential backoff and full jitter while
+    the run's `retry_budget` lasts, so an outage cannot multiply the load.
+    With `hedge_percentile` set, an attempt still pending after that quantile
+    of recent latencies is duplicated and the first answer wins; the other
+    request is cancelled. Requests carry the policy's creation time as their
+    priority in the shared rate-limit scheduler, so earlier runs go first.
+    Every attempt's latency, outcome and cost is reported to the provider
+    router.
+    """
+
+    def __init__(
+        self,
+        timeout_s: float | None = CALL_TIMEOUT_S,
+        max_retries: int = CALL_MAX_RETRIES,
+        backoff_s: float = RETRY_BACKOFF_S,
+        backoff_max_s: float = RETRY_BACKOFF_MAX_S,
+        retry_budget: int = RETRY_BUDGET,
+        hedge_percentile: float | None = HEDGE_PERCENTILE,
+        rng: random.Random | None = None,
+        router: ProviderRouter | None = None,
+    ):
+        self.timeout_s = timeout_s
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.backoff_max_s = backoff_max_s
+        self.retry_budget = retry_budget
+        self.hedge_percentile = hedge_percentile
+        self.stats = CallStats()
+        self.router = router or get_router()
+        # Earlier runs outrank later ones in the shared request scheduler
+        self.priority = time.monotonic()
+        self._rng = rng or random.Random()
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def hedge_delay(self) -> float | None:
+        """Latency quantile after which an attempt is hedged, once enough calls were seen."""
+        if self.hedge_percentile is None or len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(self.hedge_percentile * len(ordered)))]
+
+    async def complete(self, provider: LLMProvider, **request) -> LLMResponse:
+        """`provider.complete(**request)` under this policy; re-raises the last error when it gives up."""
+        self.stats.calls += 1
+        with request_priority(self.priority):
+            return await self._complete(provider, request)
+
+    async def retry(self, provider: LLMProvider, error: Exception, **request) -> LLMResponse:
+        """Continue with the retries of a request whose first attempt failed elsewhere
+        (e.g. inside a batch), drawing on the same retry budget."""
+        self.stats.calls += 1
+        with request_priority(self.priority):
+            return await self._complete(provider, request, error)
+
+    async def _complete(
+        self, provider: LLMProvider, request: dict, error: Exception | None = None,
+    ) -> LLMResponse:
+        loop = asyncio.get_running_loop()
+        for attempt in range(0 if error is None else 1, self.max_retries + 1):
+            if attempt:
+                if self.stats.retries >= self.retry_budget:
+                    self.stats.retries_denied += 1
+                    break
+                self.stats.retries += 1
+                await asyncio.sleep(self._rng.uniform(0, min(self.backoff_max_s, self.backoff_s * 2 ** (attempt - 1))))
+            start = loop.time()
+            try:
+                response = await asyncio.wait_for(self._attempt(provider, request), self.timeout_s)
+            except CacheMissError:
+                raise
+            except asyncio.TimeoutError as exc:
+                self.stats.timeouts += 1
+                error = exc
+                logger.warning("%s timed out (attempt %d)", provider.model_id, attempt + 1)
+            except Exception as exc:
+                self.stats.errors += 1
+                error = exc
+                logger.warning("%s failed (attempt %d): %r", provider.model_id, attempt + 1, exc)
+            else:
+                self.stats.succeeded += 1
+                # Cache hits report no usage and say nothing about the backend
+                if response.prompt_tokens is not None:
+                    self.router.observe(
+                        provider.key, loop.time() - start, True, request_cost(provider.model_id, response),
+                    )
+                return response
+            self.router.observe(provider.key, loop.time() - start, False)
+        self.stats.failed += 1
+        raise error
+
+    async def _attempt(self, provider: LLMProvider, request: dict) -> LLMResponse:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        delay = self.hedge_delay()
+        self.stats.attempts += 1
+        primary = asyncio.ensure_future(provider.complete(**request))
+        pending = {primary}
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    self.stats.hedges += 1
+                    self.stats.attempts += 1
+                    pending.add(asyncio.ensure_future(provider.complete(**request)))
+
+            # First successful answer wins; fail only once every request has failed
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((t for t in done if t.exception() is None), None)
+                if winner is not None or not pending:
+                    break
+            if winner is None:
+                return next(iter(done)).result()
+            if winner is not primary:
+                self.stats.hedge_wins += 1
+            self._latencies.append(loop.time() - start)
+            return winner.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+async def evaluate(
+    archetype: Archetype,
+    provider: LLMProvider,
+    bundle: EvidenceBundle,
+    iteration: int,
+) -> Ballot | None:
+    """Run a single evaluator agent and return a parsed Ballot, or None on failure."""
+    [ballot] = await evaluate_many(archetype, provider, bundle, [iteration])
+    return ballot
+
+
+async def evaluate_many(
+    archetype: Archetype,
+    provider: LLMProvider,
+    bundle: EvidenceBundle | BundlePrompt,
+    iterations: list[int],
+    policy: CallPolicy | None = None,
+) -> list[Ballot | None]:
+    """Ask for one completion per iteration in a single request (the `n` parameter).
+
+    The shared evidence prompt is sent and billed once for all of them, so its
+    token counts go on the first parsed ballot and the rest record zero.
+    Pass a `BundlePrompt` to reuse one rendering across calls and the run's
+    `CallPolicy` for deadlines, retries and hedging. Returns one entry per
+    iteration, None where the call or parse failed.
+    """
+    prompt = bundle if isinstance(bundle, BundlePrompt) else render_bundle_prompt(bundle)
+    policy = policy or CallPolicy()
+
+    try:
+        response = await policy.complete(
+            provider,
+            system=prompt.shared,
+            user=prompt.user_message(archetype),
+            temperature=0.8,
+            n=len(iterations),
+        )
+    except CacheMissError:
+        raise  # strict replay must fail the run, not drop a ballot
+    except Exception:
+        logger.exception("LLM call failed for %s on %s", archetype.name, provider.model_id)
+        return [None] * len(iterations)
+
+    return _ballots_from_response(response, archetype, provider, iterations, policy.stats)
+
+
+def _ballots_from_response(
+    response: LLMResponse,
+    archetype: Archetype,
+    provider: LLMProvider,
+    iterations: list[int],
+    stats: CallStats,
+) -> list[Ballot | None]:
+    """Parse an n-completion response into one ballot (or None) per iteration."""
+    if len(response.choices) < len(iterations):
+        stats.malformed += len(iterations) - len(response.choices)
+        logger.warning(
+            "%s returned %d of %d requested completions for %s",
+            provider.model_id, len(response.choices), len(iterations), archetype.name,
+        )
+    ballots: list[Ballot | None] = [None] * len(iterations)
+    usage = {"prompt_tokens": response.prompt_tokens, "cached_prompt_tokens": response.cached_tokens}
+    for k, content in enumerate(response.choices[:len(iterations)]):
+        ballot = _parse_ballot(content, archetype, provider, response.model, iterations[k])
+        if ballot is None:
+            stats.malformed += 1
+        elif response.prompt_tokens is not None:
+            ballot = ballot.model_copy(update=usage)
+            usage = {"prompt_tokens": 0, "cached_prompt_tokens": 0}
+        ballots[k] = ballot
+    return ballots
+
+
+async def evaluate_batch(
+    provider: LLMProvider,
+    bundle: EvidenceBundle | BundlePrompt,
+    calls: list[tuple[Archetype, list[int]]],
+    policy: CallPolicy | None = None,
+) -> list[list[Ballot | None]]:
+    """Submit several `evaluate_many` calls to a `supports_batch` provider as one batch.
+
+    `provider.complete_batch` gives each underlying request the policy's
+    deadline, so one slow request only fails the calls it carried. Answered
+    calls are kept; failed ones continue with the policy's retries
+    (backoff, hedging and the run's retry budget) one by one.
+    Returns one ballot list per call, in order.
+    """
+    prompt = bundle if isinstance(bundle, BundlePrompt) else render_bundle_prompt(bundle)
+    policy = policy or CallPolicy()
+    requests = [
+        CompletionRequest(prompt.shared, prompt.user_message(arch), temperature=0.8, n=len(iterations))
+        for arch, iterations in calls
+    ]
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    policy.stats.attempts += len(requests)
+    with request_priority(policy.priority):
+        responses = await provider.complete_batch(requests, policy.timeout_s)
+    elapsed = loop.time() - start
+
+    async def retry(k: int, error: Exception) -> list[Ballot | None]:
+        (arch, iterations), request = calls[k], requests[k]
+        try:
+            response = await policy.retry(
+                provider, error, system=request.system, user=request.user,
+                temperature=request.temperature, n=request.n,
+            )
+        except CacheMissError:
+            raise
+        except Exception:
+            logger.exception("LLM call failed for %s on %s", arch.name, provider.model_id)
+            return [None] * len(iterations)
+        return _ballots_from_response(response, arch, provider, iterations, policy.stats)
+
+    results: list[list[Ballot | None] | None] = []
+    retries: list[int] = []
+    for k, ((arch, iterations), response) in enumerate(zip(calls, responses)):
+        if isinstance(response, CacheMissError):
+            raise response
+        if isinstance(response, BaseException):
+            if isinstance(response, asyncio.TimeoutError):
+                policy.stats.timeouts += 1
+            else:
+                policy.stats.errors += 1
+            policy.router.observe(provider.key, elapsed, False)
+            logger.warning("Batched call for %s on %s failed: %r", arch.name, provider.model_id, response)
+            results.append(None)
+            retries.append(k)
+            continue
+        policy.stats.calls += 1
+        policy.stats.succeeded += 1
+        if response.prompt_tokens is not None:
+            policy.router.observe(provider.key, elapsed, True, request_cost(provider.model_id, response))
+        results.append(_ballots_from_response(response, arch, provider, iterations, policy.stats))
+
+    retried = await asyncio.gather(*(retry(k, responses[k]) for k in retries))
+    for k, ballots in zip(retries, retried):
+        results[k] = ballots
+    return results
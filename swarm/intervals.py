@@ -0,0 +1,341 @@
+"""Exact Dirichlet credible intervals via Beta-marginal quantiles (NumPy only).
+
+Each marginal of Dir(alpha) is Beta(alpha_k, alpha_0 - alpha_k), so a credible
+interval is two inverse regularized incomplete Beta evaluations. The public
+functions are vectorized: pass alpha with shape (..., K) to get intervals for
+many verdicts at once. A single verdict (alpha of shape (K,)) or scalar Beta
+arguments take a plain `math` path instead, since NumPy's per-call overhead on
+3-element arrays dominates the handful of continued-fraction steps it needs.
+"""
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+# Lanczos approximation (g = 7, n = 9), good to ~1e-15 for x > 0
+_LANCZOS_G = 7.0
+_LANCZOS_COEFFS = np.array([
+    0.99999999999980993,
+    676.5203681218851,
+    -1259.1392167224028,
+    771.32342877765313,
+    -176.61502916214059,
+    12.507343278686905,
+    -0.13857109526572012,
+    9.9843695780195716e-6,
+    1.5056327351493116e-7,
+])
+
+_CF_MAX_ITER = 300
+_CF_EPS = 1e-15
+_TINY = 1e-300
+_PPF_MAX_ITER = 60
+_PPF_TOL = 1e-12
+
+
+def log_gamma(x: np.ndarray) -> np.ndarray:
+    """log Γ(x) for x > 0."""
+    x = np.asarray(x, dtype=float)
+    z = x - 1.0
+    series = np.full_like(z, _LANCZOS_COEFFS[0])
+    for i in range(1, len(_LANCZOS_COEFFS)):
+        series = series + _LANCZOS_COEFFS[i] / (z + i)
+    t = z + _LANCZOS_G + 0.5
+    return 0.5 * np.log(2 * np.pi) + (z + 0.5) * np.log(t) - t + np.log(series)
+
+
+def log_beta(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return log_gamma(a) + log_gamma(b) - log_gamma(a + b)
+
+
+def _beta_cf(x: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Continued fraction for the incomplete Beta function (modified Lentz)."""
+    qab = a + b
+    qap = a + 1.0
+    qam = a - 1.0
+    c = np.ones_like(x)
+    d = 1.0 - qab * x / qap
+    d = np.where(np.abs(d) < _TINY, _TINY, d)
+    d = 1.0 / d
+    h = d.copy()
+
+    # Converged entries keep multiplying by ~1.0, so no per-entry masking is needed
+    for m in range(1, _CF_MAX_ITER + 1):
+        m2 = 2 * m
+        # Even step
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        d = np.where(np.abs(d) < _TINY, _TINY, d)
+        c = 1.0 + aa / c
+        c = np.where(np.abs(c) < _TINY, _TINY, c)
+        d = 1.0 / d
+        h *= d * c
+        # Odd step
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        d = np.where(np.abs(d) < _TINY, _TINY, d)
+        c = 1.0 + aa / c
+        c = np.where(np.abs(c) < _TINY, _TINY, c)
+        d = 1.0 / d
+        delta = d * c
+        h *= delta
+        if np.abs(delta - 1.0).max() <= _CF_EPS:
+            break
+    return h
+
+
+def beta_cdf(x: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Regularized incomplete Beta function I_x(a, b), broadcast over inputs."""
+    x, a, b = np.broadcast_arrays(
+        np.asarray(x, dtype=float), np.asarray(a, dtype=float), np.asarray(b, dtype=float),
+    )
+    if x.ndim == 0:
+        a_, b_ = float(a), float(b)
+        return np.float64(_beta_cdf_scalar(float(x), a_, b_, _log_beta_scalar(a_, b_)))
+    return _beta_cdf(x, a, b, log_beta(a, b))
+
+
+def _beta_cdf(x: np.ndarray, a: np.ndarray, b: np.ndarray, log_b: np.ndarray) -> np.ndarray:
+    xc = np.clip(x, 0.0, 1.0)
+    inner = (xc > 0.0) & (xc < 1.0)
+    safe_x = np.where(inner, xc, 0.5)
+
+    log_front = a * np.log(safe_x) + b * np.log1p(-safe_x) - log_b
+    # The continued fraction converges fastest below the mean; use symmetry above it
+    flip = safe_x > (a + 1.0) / (a + b + 2.0)
+    xs = np.where(flip, 1.0 - safe_x, safe_x)
+    as_ = np.where(flip, b, a)
+    bs = np.where(flip, a, b)
+    frac = np.exp(log_front) * _beta_cf(xs, as_, bs) / as_
+    result = np.where(flip, 1.0 - frac, frac)
+
+    result = np.where(xc <= 0.0, 0.0, result)
+    result = np.where(xc >= 1.0, 1.0, result)
+    return np.clip(result, 0.0, 1.0)
+
+
+def _ppf_initial_guess(q: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Starting point for the inverse (Numerical Recipes, `invbetai`)."""
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # Both shapes >= 1: normal approximation
+        pp = np.where(q < 0.5, q, 1.0 - q)
+        t = np.sqrt(-2.0 * np.log(np.maximum(pp, _TINY)))
+        z = (2.30753 + t * 0.27061) / (1.0 + t * (0.99229 + t * 0.04481)) - t
+        z = np.where(q < 0.5, -z, z)
+        al = (z * z - 3.0) / 6.0
+        h = 2.0 / (1.0 / (2.0 * a - 1.0) + 1.0 / (2.0 * b - 1.0))
+        w = z * np.sqrt(al + h) / h - (1.0 / (2.0 * b - 1.0) - 1.0 / (2.0 * a - 1.0)) * (
+            al + 5.0 / 6.0 - 2.0 / (3.0 * h)
+        )
+        normal_guess = a / (a + b * np.exp(2.0 * w))
+
+        # Otherwise: power-law tails
+        lna = np.log(a / (a + b))
+        lnb = np.log(b / (a + b))
+        t2 = np.exp(a * lna) / a
+        u = np.exp(b * lnb) / b
+        w2 = t2 + u
+        tail_guess = np.where(
+            q < t2 / w2,
+            np.power(a * w2 * q, 1.0 / a),
+            1.0 - np.power(b * w2 * (1.0 - q), 1.0 / b),
+        )
+
+    guess = np.where((a >= 1.0) & (b >= 1.0), normal_guess, tail_guess)
+    guess = np.where(np.isfinite(guess), guess, 0.5)
+    return np.clip(guess, 1e-12, 1.0 - 1e-12)
+
+
+def beta_ppf(q: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Inverse of the regularized incomplete Beta function: x with I_x(a, b) = q.
+
+    Newton iterations on the CDF, kept inside a shrinking bisection bracket so
+    every step is guaranteed to make progress.
+    """
+    q, a, b = np.broadcast_arrays(
+        np.asarray(q, dtype=float), np.asarray(a, dtype=float), np.asarray(b, dtype=float),
+    )
+    x = _ppf_initial_guess(q, a, b)
+    lo = np.zeros_like(x)
+    hi = np.ones_like(x)
+    log_b = log_beta(a, b)
+
+    for _ in range(_PPF_MAX_ITER):
+        err = _beta_cdf(x, a, b, log_b) - q
+        lo = np.where(err < 0, x, lo)
+        hi = np.where(err > 0, x, hi)
+
+        with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+            log_pdf = (a - 1.0) * np.log(x) + (b - 1.0) * np.log1p(-x) - log_b
+            step = err / np.exp(log_pdf)
+        x_new = x - step
+        bisect = ~np.isfinite(x_new) | (x_new < lo) | (x_new > hi)
+        x_new = np.where(bisect, 0.5 * (lo + hi), x_new)
+
+        # Stop on a tiny Newton step or once the bracket has collapsed to
+        # neighbouring floats (where Newton can no longer stay inside it)
+        converged = (np.abs(step) < _PPF_TOL) | (hi - lo < _PPF_TOL)
+        x = np.where(converged, x, x_new)
+        if converged.all():
+            break
+
+    x = np.where(q <= 0.0, 0.0, x)
+    return np.where(q >= 1.0, 1.0, x)
+
+
+# ── Scalar path (one verdict) ───────────────────────────────────────
+
+def _log_beta_scalar(a: float, b: float) -> float:
+    return math.lgamma(a) + math.lgamma(b) - math.lgamma(a + b)
+
+
+def _beta_cf_scalar(x: float, a: float, b: float) -> float:
+    """`_beta_cf` for one (x, a, b), stopping as soon as it converges."""
+    qab = a + b
+    qap = a + 1.0
+    qam = a - 1.0
+    c = 1.0
+    d = 1.0 - qab * x / qap
+    if abs(d) < _TINY:
+        d = _TINY
+    d = 1.0 / d
+    h = d
+
+    for m in range(1, _CF_MAX_ITER + 1):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        if abs(d) < _TINY:
+            d = _TINY
+        c = 1.0 + aa / c
+        if abs(c) < _TINY:
+            c = _TINY
+        d = 1.0 / d
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        if abs(d) < _TINY:
+            d = _TINY
+        c = 1.0 + aa / c
+        if abs(c) < _TINY:
+            c = _TINY
+        d = 1.0 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) <= _CF_EPS:
+            break
+    return h
+
+
+def _beta_cdf_scalar(x: float, a: float, b: float, log_b: float) -> float:
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    front = math.exp(a * math.log(x) + b * math.log1p(-x) - log_b)
+    if x > (a + 1.0) / (a + b + 2.0):
+        result = 1.0 - front * _beta_cf_scalar(1.0 - x, b, a) / b
+    else:
+        result = front * _beta_cf_scalar(x, a, b) / a
+    return min(max(result, 0.0), 1.0)
+
+
+def _ppf_initial_guess_scalar(q: float, a: float, b: float) -> float:
+    """`_ppf_initial_guess` for one (q, a, b)."""
+    try:
+        if a >= 1.0 and b >= 1.0:
+            pp = q if q < 0.5 else 1.0 - q
+            t = math.sqrt(-2.0 * math.log(max(pp, _TINY)))
+            z = (2.30753 + t * 0.27061) / (1.0 + t * (0.99229 + t * 0.04481)) - t
+            if q < 0.5:
+                z = -z
+            al = (z * z - 3.0) / 6.0
+            h = 2.0 / (1.0 / (2.0 * a - 1.0) + 1.0 / (2.0 * b - 1.0))
+            w = z * math.sqrt(al + h) / h - (1.0 / (2.0 * b - 1.0) - 1.0 / (2.0 * a - 1.0)) * (
+                al + 5.0 / 6.0 - 2.0 / (3.0 * h)
+            )
+            guess = a / (a + b * math.exp(2.0 * w))
+        else:
+            t2 = math.exp(a * math.log(a / (a + b))) / a
+            u = math.exp(b * math.log(b / (a + b))) / b
+            w2 = t2 + u
+            if q < t2 / w2:
+                guess = (a * w2 * q) ** (1.0 / a)
+            else:
+                guess = 1.0 - (b * w2 * (1.0 - q)) ** (1.0 / b)
+    except (ValueError, ZeroDivisionError, OverflowError):
+        guess = 0.5
+    if not math.isfinite(guess):
+        guess = 0.5
+    return min(max(guess, 1e-12), 1.0 - 1e-12)
+
+
+def _beta_ppf_scalar(q: float, a: float, b: float) -> float:
+    """`beta_ppf` for one (q, a, b)."""
+    if q <= 0.0:
+        return 0.0
+    if q >= 1.0:
+        return 1.0
+    x = _ppf_initial_guess_scalar(q, a, b)
+    lo, hi = 0.0, 1.0
+    log_b = _log_beta_scalar(a, b)
+
+    for _ in range(_PPF_MAX_ITER):
+        err = _beta_cdf_scalar(x, a, b, log_b) - q
+        if err < 0:
+            lo = x
+        elif err > 0:
+            hi = x
+
+        try:
+            log_pdf = (a - 1.0) * math.log(x) + (b - 1.0) * math.log1p(-x) - log_b
+            step = err / math.exp(log_pdf)
+        except (ValueError, ZeroDivisionError, OverflowError):
+            step = math.inf
+        if abs(step) < _PPF_TOL or hi - lo < _PPF_TOL:
+            break
+        x_new = x - step
+        if not math.isfinite(x_new) or x_new < lo or x_new > hi:
+            x_new = 0.5 * (lo + hi)
+        x = x_new
+    return x
+
+
+def dirichlet_intervals(
+    alpha: np.ndarray,
+    level: float = 0.95,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Equal-tailed credible intervals for every marginal of Dir(alpha).
+
+    `alpha` has shape (..., K); returns (lo, hi) arrays of the same shape.
+    """
+    alpha = np.asarray(alpha, dtype=float)
+    tail = (1.0 - level) / 2.0
+    if alpha.ndim == 1 and np.ndim(level) == 0:
+        total = float(alpha.sum())
+        shapes = [(float(a_k), total - float(a_k)) for a_k in alpha]
+        lo = np.array([_beta_ppf_scalar(tail, a_k, b_k) for a_k, b_k in shapes])
+        hi = np.array([_beta_ppf_scalar(1.0 - tail, a_k, b_k) for a_k, b_k in shapes])
+        return lo, hi
+
+    rest = alpha.sum(axis=-1, keepdims=True) - alpha
+    quantiles = np.stack(np.broadcast_arrays(tail, 1.0 - tail))
+    bounds = beta_ppf(quantiles.reshape((2,) + (1,) * alpha.ndim), alpha, rest)
+    return bounds[0], bounds[1]
+
+
+def dirichlet_summary(
+    counts: np.ndarray,
+    prior: float = 1.0,
+    level: float = 0.95,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Posterior means and credible bounds for vote counts of shape (..., K).
+
+    Vectorized across verdicts: a (N, 3) array of stored vote counts is
+    re-scored in a single call. Returns (mean, lo, hi), each shaped like counts.
+    """
+    alpha = np.asarray(counts, dtype=float) + prior
+    mean = alpha / alpha.sum(axis=-1, keepdims=True)
+    lo, hi = dirichlet_intervals(alpha, level)
+    return mean, lo, hi
@@ -0,0 +1,332 @@
+"""Background jobs — queue long swarm runs and let clients poll, reattach or cancel."""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable
+
+from swarm.config import JOB_QUEUE_MAX, JOB_RETENTION_S, JOB_WORKERS, JOBS_DB_PATH
+from swarm.schemas import JobInfo
+
+logger = logging.getLogger(__name__)
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+# A runner turns a job's request into (event, data) pairs; a "verdict" event
+# is the job's result and an "error" event fails it.
+Runner = Callable[[dict], AsyncIterator[tuple[str, dict]]]
+
+
+class QueueFullError(RuntimeError):
+    """Raised by `JobManager.submit` when `max_queued` jobs are already waiting."""
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    request: dict
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    events: int = 0                      # events emitted so far
+    last_snapshot: dict | None = None
+    error: str | None = None
+    result: dict | None = None
+    _wake: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    _task: asyncio.Task | None = field(default=None, repr=False)
+
+    def changed(self) -> None:
+        """Wake everyone following the job's events."""
+        self._wake.set()
+        self._wake = asyncio.Event()
+
+    def info(self, position: int | None = None) -> JobInfo:
+        return JobInfo(
+            id=self.id,
+            kind=self.kind,
+            status=self.status,
+            created_at=self.created_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            queue_position=position,
+            events=self.events,
+            last_snapshot=self.last_snapshot,
+            error=self.error,
+        )
+
+
+# ── Persistent store ───────────────────────────────────────────────
+
+class JobStore:
+    """Jobs and their event logs in SQLite, so results outlive the process."""
+
+    _COLUMNS = "id, kind, request, status, created_at, started_at, finished_at, events, last_snapshot, error, result"
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, request TEXT NOT NULL, status TEXT NOT NULL,"
+            " created_at REAL NOT NULL, started_at REAL, finished_at REAL, events INTEGER NOT NULL,"
+            " last_snapshot TEXT, error TEXT, result TEXT)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS job_events ("
+            " job_id TEXT NOT NULL, seq INTEGER NOT NULL, event TEXT NOT NULL, data TEXT NOT NULL,"
+            " PRIMARY KEY (job_id, seq))"
+        )
+
+    def save(self, job: Job) -> None:
+        row = (
+            job.id, job.kind, json.dumps(job.request), job.status, job.created_at, job.started_at,
+            job.finished_at, job.events, json.dumps(job.last_snapshot) if job.last_snapshot else None,
+            job.error, json.dumps(job.result) if job.result is not None else None,
+        )
+        placeholders = ", ".join("?" * len(row))
+        with self._lock:
+            self._db.execute(f"INSERT OR REPLACE INTO jobs ({self._COLUMNS}) VALUES ({placeholders})", row)
+
+    def add_event(self, job_id: str, seq: int, event: str, data: dict) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO job_events (job_id, seq, event, data) VALUES (?, ?, ?, ?)",
+                (job_id, seq, event, json.dumps(data)),
+            )
+
+    def _job(self, row: tuple) -> Job:
+        id_, kind, request, status, created, started, finished, events, snapshot, error, result = row
+        return Job(
+            id_, kind, json.loads(request), status, created, started, finished, events,
+            json.loads(snapshot) if snapshot else None, error, json.loads(result) if result else None,
+        )
+
+    def load(self, job_id: str) -> Job | None:
+        with self._lock:
+            row = self._db.execute(f"SELECT {self._COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def unfinished(self) -> list[Job]:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {self._COLUMNS} FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [self._job(row) for row in rows]
+
+    def events(self, job_id: str, after: int = 0) -> list[tuple[int, str, dict]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, event, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after),
+            ).fetchall()
+        return [(seq, event, json.loads(data)) for seq, event, data in rows]
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def prune(self, older_than_s: float) -> int:
+        """Delete finished jobs (and their events) that finished more than `older_than_s` ago."""
+        cutoff = time.time() - older_than_s
+        with self._lock:
+            ids = [r[0] for r in self._db.execute(
+                "SELECT id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,)
+            )]
+            for job_id in ids:
+                self._db.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+                self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return len(ids)
+
+
+# ── Worker pool ────────────────────────────────────────────────────
+
+class JobManager:
+    """Bounded in-process worker pool over a FIFO queue of persisted jobs.
+
+    At most `workers` jobs run at once and at most `max_queued` wait, so
+    request bursts queue instead of each holding a connection open for a
+    whole run. Every event a job emits is appended to its log, which
+    clients can replay and follow from any position. Jobs left queued by a
+    previous process are re-queued on `start`; ones left running are failed.
+    """
+
+    def __init__(
+        self,
+        runners: dict[str, Runner],
+        store: JobStore | None = None,
+        workers: int = JOB_WORKERS,
+        max_queued: int = JOB_QUEUE_MAX,
+    ):
+        self.runners = runners
+        self.store = store or JobStore()
+        self.workers = workers
+        self.max_queued = max_queued
+        self._queue: deque[Job] = deque()
+        self._ready: asyncio.Condition | None = None
+        self._live: dict[str, Job] = {}
+        self._workers: list[asyncio.Task] = []
+        self._stopping = False
+        self._waits: deque[float] = deque(maxlen=100)
+        self._runs: deque[float] = deque(maxlen=100)
+
+    async def start(self) -> None:
+        self._ready = asyncio.Condition()
+        self._stopping = False
+        pruned = self.store.prune(JOB_RETENTION_S)
+        if pruned:
+            logger.info("Pruned %d finished jobs", pruned)
+        for job in self.store.unfinished():
+            if job.status == "running" or job.kind not in self.runners:
+                self._finish(job, "failed", error="interrupted by a server restart")
+            else:
+                self._live[job.id] = job
+                self._queue.append(job)
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        logger.info("Job workers started: %d, %d jobs re-queued", self.workers, len(self._queue))
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, kind: str, request: dict) -> Job:
+        if kind not in self.runners:
+            raise ValueError(f"Unknown job kind {kind!r}")
+        if len(self._queue) >= self.max_queued:
+            raise QueueFullError(f"{len(self._queue)} jobs already queued")
+        job = Job(uuid.uuid4().hex, kind, request)
+        self.store.save(job)
+        self._live[job.id] = job
+        self._queue.append(job)
+        asyncio.get_running_loop().create_task(self._notify())
+        return job
+
+    async def _notify(self) -> None:
+        async with self._ready:
+            self._ready.notify()
+
+    def get(self, job_id: str) -> Job | None:
+        return self._live.get(job_id) or self.store.load(job_id)
+
+    def position(self, job: Job) -> int | None:
+        """1-based place in the queue of a queued job."""
+        for i, queued in enumerate(self._queue):
+            if queued.id == job.id:
+                return i + 1
+        return None
+
+    def cancel(self, job_id: str) -> Job | None:
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+        if job.status == "queued":
+            self._queue.remove(job)
+            self._finish(job, "cancelled")
+        elif job._task is not None:
+            job._task.cancel()   # `_run` records the cancellation
+        return job
+
+    async def events(self, job_id: str, after: int = 0) -> AsyncIterator[tuple[int, str, dict]]:
+        """Replay a job's events after sequence number `after`, then follow it until it finishes."""
+        while True:
+            job = self._live.get(job_id)
+            finished = job is None or job.status in FINISHED
+            wake = job._wake if job is not None else None
+            for seq, event, data in self.store.events(job_id, after):
+                yield seq, event, data
+                after = seq
+            if finished:
+                return
+            await wake.wait()
+
+    def metrics(self) -> dict:
+        running = sum(job.status == "running" for job in self._live.values())
+        return {
+            "workers": self.workers,
+            "running": running,
+            "queued": len(self._queue),
+            "max_queued": self.max_queued,
+            "mean_queue_wait_s": sum(self._waits) / len(self._waits) if self._waits else None,
+            "mean_run_s": sum(self._runs) / len(self._runs) if self._runs else None,
+            "jobs_by_status": self.store.counts(),
+        }
+
+    async def _work(self) -> None:
+        while True:
+            async with self._ready:
+                await self._ready.wait_for(lambda: bool(self._queue))
+                job = self._queue.popleft()
+                # Leave "queued" in the same step as the queue, so `cancel` always
+                # finds a queued job in the queue and a running one with its task
+                self._start(job)
+            # Its own task, so cancelling the job leaves the worker running
+            job._task = asyncio.create_task(self._run(job))
+            try:
+                await asyncio.wait({job._task})
+            except asyncio.CancelledError:
+                job._task.cancel()
+                await asyncio.wait({job._task})
+                raise
+            finally:
+                if job.status not in FINISHED:
+                    # Cancelled before `_run` began, so it could not record the outcome
+                    self._interrupted(job)
+                job._task = None
+
+    def _start(self, job: Job) -> None:
+        job.status, job.started_at = "running", time.time()
+        self._waits.append(job.started_at - job.created_at)
+        self.store.save(job)
+        job.changed()
+
+    def _interrupted(self, job: Job) -> None:
+        if self._stopping:
+            self._finish(job, "failed", error="interrupted by a server shutdown")
+        else:
+            self._finish(job, "cancelled")
+
+    async def _run(self, job: Job) -> None:
+        try:
+            async for event, data in self.runners[job.kind](job.request):
+                job.events += 1
+                self.store.add_event(job.id, job.events, event, data)
+                if event == "snapshot":
+                    job.last_snapshot = data
+                elif event == "verdict":
+                    job.result = data
+                elif event == "error":
+                    job.error = data.get("detail", "failed")
+                self.store.save(job)
+                job.changed()
+        except asyncio.CancelledError:
+            self._interrupted(job)
+            raise
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            job.error = repr(e)
+        self._runs.append(time.time() - job.started_at)
+        self._finish(job, "succeeded" if job.result is not None else "failed")
+
+    def _finish(self, job: Job, status: str, error: str | None = None) -> None:
+        job.status, job.finished_at = status, time.time()
+        if error is not None:
+            job.error = error
+        self.store.save(job)
+        self._live.pop(job.id, None)
+        job.changed()
+        logger.info("Job %s %s", job.id, status)
@@ -1,59 +1,427 @@
 from __future__ import annotations
 
+import asyncio
+import email.utils
+import importlib.util
 import os
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 
+import httpx
 import openai
 from dotenv import load_dotenv
 
-from swarm.config import MODEL, TEMPERATURE
+from swarm.config import (
+    DEFAULT_RATE_LIMIT,
+    HTTP2,
+    HTTP_KEEPALIVE_EXPIRY_S,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE,
+    HTTP_TIMEOUT_S,
+    LLM_BACKENDS,
+    MODEL,
+    TEMPERATURE,
+)
+from swarm.ratelimit import estimate_tokens, get_scheduler
 
 load_dotenv()
 
 
 @dataclass
 class LLMResponse:
-    content: str
+    content: str                                       # first choice
     model: str
+    choices: list[str] = field(default_factory=list)   # all n completions, content first
+    prompt_tokens: int | None = None                   # input tokens billed, if reported
+    cached_tokens: int | None = None                   # of which served from the provider's prefix cache
+    completion_tokens: int | None = None               # output tokens over all choices, if reported
+
+    def __post_init__(self) -> None:
+        if not self.choices:
+            self.choices = [self.content]
+
+
+@dataclass
+class CompletionRequest:
+    system: str
+    user: str
+    temperature: float = TEMPERATURE
+    n: int = 1
 
 
 class LLMProvider(ABC):
     @abstractmethod
-    async def complete(self, system: str, user: str, temperature: float = TEMPERATURE) -> LLMResponse:
+    async def complete(
+        self, system: str, user: str, temperature: float = TEMPERATURE, n: int = 1,
+    ) -> LLMResponse:
+        """Return `n` independent completions of one prompt (see `LLMResponse.choices`)."""
         ...
 
+    @property
+    def supports_batch(self) -> bool:
+        """Whether `complete_batch` can send several prompts in one request."""
+        return False
+
+    async def complete_batch(
+        self, requests: list[CompletionRequest], timeout_s: float | None = None,
+    ) -> list[LLMResponse | Exception]:
+        """Send several prompts in as few requests as the backend takes.
+
+        Every underlying request gets its own `timeout_s` deadline. A failed
+        request's error (including the timeout) comes back in place of each
+        response it carried instead of raising. Only providers with
+        `supports_batch` implement this.
+        """
+        raise NotImplementedError(f"{type(self).__name__} has no batch endpoint")
+
     @property
     @abstractmethod
     def model_id(self) -> str:
         ...
 
+    @property
+    def key(self) -> str:
+        """Identifies the backend and model for rate limits and routing statistics."""
+        return self.model_id
+
 
 class OpenAIProvider(LLMProvider):
-    def __init__(self, model: str | None = None):
+    def __init__(self, model: str | None = None, client: openai.AsyncOpenAI | None = None):
         self._model = model or MODEL
-        self._client = openai.AsyncOpenAI(api_key=os.environ["OPENAI_API_KEY"])
+        # Pass the registry's shared client; a private one opens its own connection pool.
+        # Clients are built with max_retries=0: CallPolicy owns retries, so every
+        # attempt is one HTTP request that the budget, stats and scheduler all see.
+        self._client = client or openai.AsyncOpenAI(api_key=os.environ["OPENAI_API_KEY"], max_retries=0)
 
     @property
     def model_id(self) -> str:
         return self._model
 
-    async def complete(self, system: str, user: str, temperature: float = TEMPERATURE) -> LLMResponse:
-        resp = await self._client.chat.completions.create(
+    @property
+    def key(self) -> str:
+        return f"openai:{self._model}"
+
+    async def complete(
+        self, system: str, user: str, temperature: float = TEMPERATURE, n: int = 1,
+    ) -> LLMResponse:
+        # Every request waits its turn under the shared rate limits for this model
+        async with get_scheduler().slot(self.key, estimate_tokens(system, user, n)) as slot:
+            try:
+                resp = await self._client.chat.completions.create(
+                    model=self._model,
+                    temperature=temperature,
+                    n=n,
+                    messages=[
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": user},
+                    ],
+                )
+            except openai.RateLimitError as e:
+                slot.throttled(_retry_after_s(e.response.headers))
+                raise
+            usage = resp.usage
+            slot.settle(usage.total_tokens if usage else None)
+
+        choices = [c.message.content for c in resp.choices]
+        details = getattr(usage, "prompt_tokens_details", None) if usage else None
+        return LLMResponse(
+            content=choices[0],
             model=self._model,
-            temperature=temperature,
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user},
-            ],
+            choices=choices,
+            prompt_tokens=usage.prompt_tokens if usage else None,
+            cached_tokens=(getattr(details, "cached_tokens", None) or 0) if usage else None,
+            completion_tokens=usage.completion_tokens if usage else None,
+        )
+
+
+def _retry_after_s(headers: httpx.Headers) -> float | None:
+    """Seconds a 429 asks us to wait: `retry-after-ms`, then `retry-after` (seconds or HTTP date)."""
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000.0
+        retry_after = headers.get("retry-after")
+        if not retry_after:
+            return None
+        try:
+            return float(retry_after)
+        except ValueError:
+            when = email.utils.parsedate_to_datetime(retry_after)
+            return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _shares(total: int | None, weights: list[int]) -> list[int | None]:
+    """Split a request-wide token count across its prompts in proportion to `weights`."""
+    if total is None:
+        return [None] * len(weights)
+    whole = sum(weights) or 1
+    shares = [total * w // whole for w in weights]
+    shares[-1] += total - sum(shares)
+    return shares
+
+
+class OpenAICompatibleProvider(OpenAIProvider):
+    """Any server speaking the OpenAI chat completions API (vLLM, llama.cpp, test stubs).
+
+    The chat completions API takes one conversation per request. With a
+    `prompt_template` (a format string with `{system}` and `{user}` fields
+    that applies the served model's chat template), `complete_batch` instead
+    renders the prompts itself and sends up to `max_batch` of them in one
+    multi-prompt `/v1/completions` request, which vLLM schedules as one batch.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        api_key: str | None = None,
+        name: str | None = None,
+        max_batch: int = 64,
+        client: openai.AsyncOpenAI | None = None,
+        prompt_template: str | None = None,
+    ):
+        super().__init__(
+            model,
+            client=client or openai.AsyncOpenAI(
+                base_url=base_url, api_key=api_key or "not-needed", max_retries=0,
+            ),
+        )
+        self.base_url = base_url
+        self.name = name or base_url
+        self.max_batch = max_batch
+        self.prompt_template = prompt_template
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}:{self._model}"
+
+    @property
+    def supports_batch(self) -> bool:
+        return self.prompt_template is not None
+
+    async def complete_batch(
+        self, requests: list[CompletionRequest], timeout_s: float | None = None,
+    ) -> list[LLMResponse | Exception]:
+        if self.prompt_template is None:
+            return await super().complete_batch(requests, timeout_s)
+        # One request per (temperature, n) and at most `max_batch` prompts, all sent at once
+        groups: dict[tuple[float, int], list[int]] = defaultdict(list)
+        for k, r in enumerate(requests):
+            groups[(r.temperature, r.n)].append(k)
+        chunks = [ks[i:i + self.max_batch] for ks in groups.values() for i in range(0, len(ks), self.max_batch)]
+        results: list[LLMResponse | Exception] = [None] * len(requests)
+
+        async def send(ks: list[int]) -> None:
+            try:
+                responses = await asyncio.wait_for(self._complete_prompts([requests[k] for k in ks]), timeout_s)
+            except Exception as exc:
+                responses = [exc] * len(ks)
+            for k, response in zip(ks, responses):
+                results[k] = response
+
+        await asyncio.gather(*(send(ks) for ks in chunks))
+        return results
+
+    async def _complete_prompts(self, requests: list[CompletionRequest]) -> list[LLMResponse | Exception]:
+        """One multi-prompt completions request; every request shares temperature and n."""
+        temperature, n = requests[0].temperature, requests[0].n
+        prompts = [self.prompt_template.format(system=r.system, user=r.user) for r in requests]
+        tokens = sum(estimate_tokens(r.system, r.user, n) for r in requests)
+        async with get_scheduler().slot(self.key, tokens) as slot:
+            try:
+                resp = await self._client.completions.create(
+                    model=self._model, prompt=prompts, temperature=temperature, n=n,
+                )
+            except openai.RateLimitError as e:
+                slot.throttled(_retry_after_s(e.response.headers))
+                raise
+            usage = resp.usage
+            slot.settle(usage.total_tokens if usage else None)
+
+        # Choices come back prompt-major: prompt i owns indices i*n .. i*n + n - 1
+        texts: list[list[str]] = [[] for _ in requests]
+        for choice in sorted(resp.choices, key=lambda c: c.index):
+            texts[choice.index // n].append(choice.text)
+        # Usage covers the whole request; attribute it to prompts by length
+        details = getattr(usage, "prompt_tokens_details", None) if usage else None
+        prompt_tokens = _shares(usage.prompt_tokens if usage else None, [len(p) for p in prompts])
+        cached_tokens = _shares(
+            (getattr(details, "cached_tokens", None) or 0) if usage else None, [len(p) for p in prompts],
+        )
+        completion_tokens = _shares(
+            usage.completion_tokens if usage else None, [sum(len(t) for t in ts) for ts in texts],
         )
-        return LLMResponse(content=resp.choices[0].message.content, model=self._model)
+        return [
+            LLMResponse(
+                content=choices[0],
+                model=self._model,
+                choices=choices,
+                prompt_tokens=prompt_tokens[i],
+                cached_tokens=cached_tokens[i],
+                completion_tokens=completion_tokens[i],
+            ) if choices else ValueError(f"{self.key} returned no completions for prompt {i}")
+            for i, choices in enumerate(texts)
+        ]
 
 
 # ── Model pool ──────────────────────────────────────────────────────
 
+def _http_client() -> httpx.AsyncClient:
+    """Pooled HTTP client with keep-alive, using HTTP/2 when the `h2` package is installed."""
+    return httpx.AsyncClient(
+        http2=HTTP2 and importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_S,
+        ),
+        timeout=httpx.Timeout(HTTP_TIMEOUT_S, connect=10.0),
+    )
+
+
+@dataclass
+class BackendSpec:
+    """One OpenAI-compatible backend from `LLM_BACKENDS`.
+
+    Without `rpm`/`tpm` the backend bypasses the rate-limit scheduler.
+    """
+
+    base_url: str
+    model: str
+    name: str | None = None
+    api_key_env: str | None = None   # environment variable holding the key, if the server wants one
+    rpm: float | None = None
+    tpm: float | None = None
+    max_batch: int = 64
+    prompt_template: str | None = None   # enables batched submission, see OpenAICompatibleProvider
+
+
+class ProviderRegistry:
+    """Owns long-lived API clients and the providers built on them.
+
+    One pooled HTTP client is shared by every provider, so runs, planner
+    calls and API requests reuse warm connections instead of paying for new
+    TLS handshakes. Clients are bound to the event loop that created them;
+    `get_registry()` closes them and hands out a fresh registry if the loop changes.
+    """
+
+    def __init__(self, backends: list[BackendSpec] | None = None):
+        self.backends = backends if backends is not None else [BackendSpec(**b) for b in LLM_BACKENDS]
+        self._http: httpx.AsyncClient | None = None
+        self._openai: openai.AsyncOpenAI | None = None
+        self._providers: dict[str, LLMProvider] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None   # set when the clients are created
+
+    def http_client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = _http_client()
+            self._loop = _running_loop()
+        return self._http
+
+    def openai_client(self) -> openai.AsyncOpenAI:
+        if self._openai is None:
+            if not os.environ.get("OPENAI_API_KEY"):
+                raise RuntimeError("OPENAI_API_KEY not set.")
+            self._openai = openai.AsyncOpenAI(
+                api_key=os.environ["OPENAI_API_KEY"], http_client=self.http_client(), max_retries=0,
+            )
+        return self._openai
+
+    def get(self, model: str | None = None) -> LLMProvider:
+        """The shared hosted-OpenAI provider for `model` (default `MODEL`)."""
+        model = model or MODEL
+        if model not in self._providers:
+            self._providers[model] = OpenAIProvider(model, client=self.openai_client())
+        return self._providers[model]
+
+    def backend(self, spec: BackendSpec) -> LLMProvider:
+        """The shared provider for an OpenAI-compatible backend."""
+        name = spec.name or spec.base_url
+        key = f"{name}:{spec.model}"
+        if key not in self._providers:
+            api_key = os.environ.get(spec.api_key_env) if spec.api_key_env else None
+            client = openai.AsyncOpenAI(
+                base_url=spec.base_url, api_key=api_key or "not-needed", http_client=self.http_client(),
+                max_retries=0,
+            )
+            limits = None if spec.rpm is None and spec.tpm is None else (
+                spec.rpm or DEFAULT_RATE_LIMIT[0], spec.tpm or DEFAULT_RATE_LIMIT[1],
+            )
+            get_scheduler().set_limits(key, limits)
+            self._providers[key] = OpenAICompatibleProvider(
+                spec.base_url, spec.model, name=name, max_batch=spec.max_batch, client=client,
+                prompt_template=spec.prompt_template,
+            )
+        return self._providers[key]
+
+    def providers(self) -> list[LLMProvider]:
+        """The hosted provider if `OPENAI_API_KEY` is set, plus every configured backend."""
+        providers = [self.backend(spec) for spec in self.backends]
+        if os.environ.get("OPENAI_API_KEY"):
+            providers.insert(0, self.get())
+        if not providers:
+            raise RuntimeError("No LLM providers configured: set OPENAI_API_KEY or LLM_BACKENDS.")
+        return providers
+
+    async def aclose(self) -> None:
+        """Close pooled connections; the registry can be reused afterwards."""
+        if self._http is not None:
+            await self._http.aclose()
+        self._http = self._openai = None
+        self._providers.clear()
+
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+_registry: ProviderRegistry | None = None
+_closing: set[asyncio.Future] = set()   # keeps retired registries' close tasks alive
+
+
+def _retire(registry: ProviderRegistry) -> None:
+    """Close a registry whose clients belong to another event loop."""
+    if registry._loop.is_running():
+        # Still serving another thread; close the clients on their own loop
+        future = asyncio.run_coroutine_threadsafe(registry.aclose(), registry._loop)
+    elif _running_loop() is None:
+        asyncio.run(registry.aclose())
+        return
+    else:
+        # Its loop has stopped; httpx can still close the pool's sockets from this one
+        future = asyncio.ensure_future(registry.aclose())
+    _closing.add(future)
+    future.add_done_callback(_closing.discard)
+
+
+def get_registry() -> ProviderRegistry:
+    """Return the process-wide provider registry.
+
+    If the event loop changed, the old registry's connections are closed and
+    a fresh registry is built for the current loop.
+    """
+    global _registry
+    if _registry is None or _registry._loop not in (None, _running_loop()):
+        if _registry is not None:
+            _retire(_registry)
+        _registry = ProviderRegistry()
+    return _registry
+
+
+async def close_registry() -> None:
+    """Shut down the shared clients (FastAPI lifespan shutdown)."""
+    global _registry
+    if _registry is not None:
+        await _registry.aclose()
+        _registry = None
+
+
 def get_available_providers() -> list[LLMProvider]:
     """Return providers for which API keys are configured."""
-    if not os.environ.get("OPENAI_API_KEY"):
-        raise RuntimeError("OPENAI_API_KEY not set.")
-    return [OpenAIProvider()]
+    return get_registry().providers()
@@ -0,0 +1,233 @@
+"""Process-wide request scheduler that keeps LLM traffic under provider rate limits."""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterator
+
+from swarm.config import (
+    CHARS_PER_TOKEN,
+    DEFAULT_RATE_LIMIT,
+    OUTPUT_TOKENS_ESTIMATE,
+    RATE_LIMIT_BURST_S,
+    RATE_LIMITS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first. Unset means "now", so requests outside a run queue FIFO
+# behind runs that started earlier.
+_request_priority: ContextVar[float | None] = ContextVar("request_priority", default=None)
+
+
+@contextmanager
+def request_priority(priority: float) -> Iterator[None]:
+    """Tag requests made in this context (and tasks it spawns) with `priority`."""
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+def estimate_tokens(system: str, user: str, n: int = 1) -> int:
+    """Rough TPM charge of a request: prompt length plus expected output per completion."""
+    return (len(system) + len(user)) // CHARS_PER_TOKEN + n * OUTPUT_TOKENS_ESTIMATE
+
+
+# ── Token buckets ──────────────────────────────────────────────────
+
+class TokenBucket:
+    """Refills continuously at `per_minute / 60` per second up to `capacity`."""
+
+    def __init__(self, per_minute: float, burst_s: float = RATE_LIMIT_BURST_S):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_s)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` (capped at capacity) is available; 0 if it is now."""
+        self._refill(now)
+        deficit = min(amount, self.capacity) - self.level
+        return max(0.0, deficit / self.rate)
+
+    def take(self, amount: float) -> None:
+        """Remove `amount` now; the level may go negative after a correction."""
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """Credit (positive) or charge (negative) the bucket after the fact."""
+        self.level = min(self.capacity, self.level + amount)
+
+    def drain(self) -> None:
+        self.level = min(self.level, 0.0)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: float
+    seq: int
+    tokens: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class _Lane:
+    """RPM and TPM buckets of one provider/model plus its priority queue of waiters."""
+
+    def __init__(self, key: str, rpm: float, tpm: float):
+        self.key = key
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.heap: list[_Waiter] = []
+        self.paused_until = 0.0
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+
+    def kick(self) -> None:
+        """Start the dispatcher, or wake it to re-check the head of the queue."""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            # First use, or the previous event loop is gone: forget its waiters
+            self.heap = [w for w in self.heap if w.future.get_loop() is loop]
+            heapq.heapify(self.heap)
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._dispatch())
+        else:
+            self._wakeup.set()
+
+    async def _dispatch(self) -> None:
+        while self.heap:
+            head = self.heap[0]
+            if head.future.done():  # cancelled while queued
+                heapq.heappop(self.heap)
+                continue
+            now = time.monotonic()
+            wait = max(
+                self.paused_until - now,
+                self.requests.wait_time(1, now),
+                self.tokens.wait_time(head.tokens, now),
+            )
+            if wait <= 0:
+                heapq.heappop(self.heap)
+                self.requests.take(1)
+                self.tokens.take(head.tokens)
+                head.future.set_result(None)
+                continue
+            # Sleep until the buckets refill, or until a new waiter may have jumped the queue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+
+# ── Scheduler ──────────────────────────────────────────────────────
+
+class Slot:
+    """An admitted request; report actual usage or a 429 back to the scheduler."""
+
+    def __init__(self, lane: _Lane | None, estimated: int):
+        self._lane = lane   # None for keys without limits
+        self.estimated = estimated
+
+    def settle(self, actual_tokens: int | None) -> None:
+        """Correct the TPM bucket by the difference between estimated and actual usage."""
+        if actual_tokens is not None and self._lane is not None:
+            self._lane.tokens.adjust(self.estimated - actual_tokens)
+
+    def throttled(self, retry_after_s: float | None = None) -> None:
+        """The provider answered 429: empty the buckets and hold the lane."""
+        lane = self._lane
+        if lane is None:
+            return
+        lane.requests.drain()
+        lane.tokens.drain()
+        if retry_after_s:
+            lane.paused_until = max(lane.paused_until, time.monotonic() + retry_after_s)
+        logger.warning("Rate limited on %s; holding requests for %.1fs", lane.key, retry_after_s or 0.0)
+
+
+class RequestScheduler:
+    """Admits LLM requests under per-provider/model requests- and tokens-per-minute limits.
+
+    Each `provider:model` key gets a lane with two token buckets and a
+    priority queue. Waiters are admitted in (priority, arrival) order as the
+    buckets refill, so a run that started earlier keeps getting served
+    before one that started later, and concurrent runs share the quota
+    instead of bursting into 429s. A key whose limits are None (e.g. a
+    self-hosted backend) is admitted immediately.
+    """
+
+    def __init__(
+        self,
+        limits: dict[str, tuple[float, float] | None] | None = None,
+        default: tuple[float, float] = DEFAULT_RATE_LIMIT,
+    ):
+        self.limits = dict(RATE_LIMITS if limits is None else limits)
+        self.default = default
+        self._lanes: dict[str, _Lane] = {}
+        self._seq = itertools.count()
+
+    def set_limits(self, key: str, limits: tuple[float, float] | None) -> None:
+        """Set (requests/min, tokens/min) for `key`, or None for no limit."""
+        self.limits[key] = limits
+        self._lanes.pop(key, None)
+
+    def _lane(self, key: str) -> _Lane | None:
+        if key not in self._lanes:
+            limits = self.limits.get(key, self.default)
+            if limits is None:
+                return None
+            self._lanes[key] = _Lane(key, *limits)
+        return self._lanes[key]
+
+    @asynccontextmanager
+    async def slot(self, key: str, tokens: int, priority: float | None = None) -> AsyncIterator[Slot]:
+        """Wait for room under `key`'s limits, then hold a `Slot` for the request."""
+        lane = self._lane(key)
+        if lane is None:
+            yield Slot(None, tokens)
+            return
+        if priority is None:
+            priority = _request_priority.get()
+        waiter = _Waiter(
+            priority if priority is not None else time.monotonic(),
+            next(self._seq),
+            tokens,
+            asyncio.get_running_loop().create_future(),
+        )
+        heapq.heappush(lane.heap, waiter)
+        lane.kick()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            waiter.future.cancel()
+            raise
+        yield Slot(lane, tokens)
+
+    def queued(self, key: str) -> int:
+        """Requests waiting for admission under `key`."""
+        lane = self._lanes.get(key)
+        return sum(not w.future.done() for w in lane.heap) if lane else 0
+
+
+_scheduler: RequestScheduler | None = None
+
+
+def get_scheduler() -> RequestScheduler:
+    """Return the process-wide scheduler, creating it on first use."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RequestScheduler()
+    return _scheduler
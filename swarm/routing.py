@@ -0,0 +1,129 @@
+"""Adaptive provider routing — send committee seats to fast, reliable, cheap backends."""
+from __future__ import annotations
+
+import math
+import random
+from dataclasses import dataclass
+
+from swarm.config import (
+    MODEL_PRICES,
+    ROUTER_COST_WEIGHT,
+    ROUTER_EWMA_ALPHA,
+    ROUTER_EXPLORE,
+    ROUTER_MIN_MODELS,
+    ROUTER_UCB_C,
+)
+from swarm.models import LLMProvider, LLMResponse
+
+
+def request_cost(model: str, response: LLMResponse) -> float | None:
+    """USD cost of one response from `MODEL_PRICES`, or None if usage or price is unknown."""
+    prices = MODEL_PRICES.get(model)
+    if prices is None or response.prompt_tokens is None:
+        return None
+    input_price, cached_price, output_price = prices
+    cached = response.cached_tokens or 0
+    return (
+        (response.prompt_tokens - cached) * input_price
+        + cached * cached_price
+        + (response.completion_tokens or 0) * output_price
+    ) / 1_000_000
+
+
+@dataclass
+class ProviderStats:
+    """Exponentially weighted online statistics for one provider key."""
+
+    calls: int = 0
+    latency_s: float = 0.0
+    success_rate: float = 1.0
+    cost_usd: float = 0.0
+
+    def update(self, latency_s: float, ok: bool, cost_usd: float | None, alpha: float) -> None:
+        self.calls += 1
+        if self.calls == 1:
+            self.latency_s = latency_s
+            self.success_rate = 1.0 if ok else 0.0
+            self.cost_usd = cost_usd or 0.0
+            return
+        self.latency_s += alpha * (latency_s - self.latency_s)
+        self.success_rate += alpha * ((1.0 if ok else 0.0) - self.success_rate)
+        if cost_usd is not None:
+            self.cost_usd += alpha * (cost_usd - self.cost_usd)
+
+
+class ProviderRouter:
+    """Bandit assignment of committee seats to providers.
+
+    Each provider's score is the expected price of one successful ballot:
+    latency plus `cost_weight` seconds per USD, divided by the success rate.
+    Seats go to the provider with the best optimistic (UCB) score, so
+    rarely tried providers still get probed. A share `explore` of seats is
+    assigned uniformly. Every committee also spans at least `min_models`
+    distinct models when the pool has them, so routing cannot collapse the
+    committee onto one model and shrink `effective_sample_size`. Picks
+    depend on these live statistics, so a sampler seed does not reproduce
+    them.
+    """
+
+    def __init__(
+        self,
+        min_models: int = ROUTER_MIN_MODELS,
+        explore: float = ROUTER_EXPLORE,
+        cost_weight: float = ROUTER_COST_WEIGHT,
+        ucb_c: float = ROUTER_UCB_C,
+        alpha: float = ROUTER_EWMA_ALPHA,
+    ):
+        self.min_models = min_models
+        self.explore = explore
+        self.cost_weight = cost_weight
+        self.ucb_c = ucb_c
+        self.alpha = alpha
+        self.stats: dict[str, ProviderStats] = {}
+
+    def observe(self, key: str, latency_s: float, ok: bool, cost_usd: float | None = None) -> None:
+        """Record one finished request to the provider `key`."""
+        self.stats.setdefault(key, ProviderStats()).update(latency_s, ok, cost_usd, self.alpha)
+
+    def score(self, key: str) -> float | None:
+        """Expected seconds-equivalent per successful ballot (lower is better); None if unseen."""
+        s = self.stats.get(key)
+        if s is None or s.calls == 0:
+            return None
+        return (s.latency_s + self.cost_weight * s.cost_usd) / max(s.success_rate, 0.05)
+
+    def _index(self, provider: LLMProvider, total: int) -> float:
+        score = self.score(provider.key)
+        if score is None:
+            return -math.inf  # try every provider at least once
+        bonus = self.ucb_c * math.sqrt(math.log(total + 1) / self.stats[provider.key].calls)
+        return score / (1.0 + bonus)
+
+    def assign(self, providers: list[LLMProvider], seats: int, rng: random.Random) -> list[LLMProvider]:
+        """Pick a provider for each of `seats` committee seats."""
+        total = sum(s.calls for s in self.stats.values())
+        ranked = sorted(providers, key=lambda p: (self._index(p, total), rng.random()))
+        chosen = [rng.choice(providers) if rng.random() < self.explore else ranked[0] for _ in range(seats)]
+
+        # Minimum model diversity: swap seats of the most repeated model for the best unused ones
+        need = min(self.min_models, seats, len({p.model_id for p in providers}))
+        for candidate in ranked:
+            models = [p.model_id for p in chosen]
+            if len(set(models)) >= need:
+                break
+            if candidate.model_id in models:
+                continue
+            crowded = max(set(models), key=models.count)
+            chosen[len(models) - 1 - models[::-1].index(crowded)] = candidate
+        return chosen
+
+
+_router: ProviderRouter | None = None
+
+
+def get_router() -> ProviderRouter:
+    """Return the process-wide router; statistics persist across runs."""
+    global _router
+    if _router is None:
+        _router = ProviderRouter()
+    return _router
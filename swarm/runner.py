@@ -2,40 +2,55 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import random
+from collections import defaultdict, deque
+from contextlib import aclosing
 from typing import AsyncIterator
 
-from swarm.aggregator import (
-    compute_distribution,
-    compute_entropy,
-    convergence_snapshot,
-    dirichlet_posterior,
-    effective_sample_size,
-    fleiss_kappa,
-    kl_divergence,
-)
+from swarm.aggregator import AggregatorState, compute_entropy
 from swarm.archetypes import ALL_ARCHETYPES, Archetype
-from swarm.config import COMMITTEE_SIZE, CONVERGENCE_PATIENCE, CONVERGENCE_THRESHOLD, MIN_BALLOTS_FOR_CONVERGENCE, NUM_ITERATIONS
-from swarm.evaluator import evaluate
+from swarm.cache import RunRecording, load_recording, save_recording, with_response_cache
+from swarm.config import (
+    BATCH_SUBMIT,
+    COMMITTEE_SIZE,
+    COMPLETIONS_PER_REQUEST,
+    LLM_CACHE_MODE,
+    MAX_IN_FLIGHT,
+    NUM_ITERATIONS,
+    ROUTING,
+    SAMPLER_SEED,
+    STRATIFIED_ESTIMATE,
+)
+from swarm.evaluator import BundlePrompt, CallPolicy, evaluate_batch, evaluate_many, render_bundle_prompt
 from swarm.models import LLMProvider, get_available_providers
-from swarm.sampler import sample_committee
-from swarm.schemas import Ballot, EvidenceBundle, ConvergenceSnapshot, VerdictDistribution
+from swarm.sampler import CommitteeSampler, StratifiedSampler, make_sampler
+from swarm.schemas import Ballot, CallStats, EvidenceBundle, ConvergenceSnapshot, VerdictDistribution
+from swarm.stopping import StoppingPolicy, make_stopping_policy
 
 logger = logging.getLogger(__name__)
 
 
 def _build_verdict(
     bundle: EvidenceBundle,
-    all_ballots: list[Ballot],
+    state: AggregatorState,
     convergence: list[ConvergenceSnapshot],
     num_iterations: int,
     committee_size: int,
     converged_at: int | None,
+    stop_reason: str | None,
+    sampler: CommitteeSampler,
+    call_stats: CallStats,
 ) -> VerdictDistribution:
-    """Build the final VerdictDistribution from accumulated ballots."""
-    (p_yes, p_no, p_null), cis = dirichlet_posterior(all_ballots)
+    """Build the final VerdictDistribution from the accumulated aggregator state."""
+    (p_yes, p_no, p_null), cis = state.posterior()
     entropy = compute_entropy(p_yes, p_no, p_null)
-    kappa = fleiss_kappa(all_ballots)
-    n_eff = effective_sample_size(all_ballots)
+    kappa = state.fleiss_kappa()
+    n_eff = state.effective_sample_size()
+
+    stratified = None
+    if isinstance(sampler, StratifiedSampler):
+        s_yes, s_no, s_null = state.stratified_distribution(sampler.weights)
+        stratified = {"YES": round(s_yes, 4), "NO": round(s_no, 4), "NULL": round(s_null, 4)}
 
     return VerdictDistribution(
         question=bundle.question,
@@ -45,70 +60,240 @@ def _build_verdict(
         num_iterations=num_iterations,
         committee_size=committee_size,
         converged_at_iteration=converged_at,
+        stop_reason=stop_reason,
         credible_intervals_95={k: (round(lo, 4), round(hi, 4)) for k, (lo, hi) in cis.items()},
         entropy=round(entropy, 4),
         fleiss_kappa=round(kappa, 4),
         effective_sample_size=round(n_eff, 2),
-        ballots=all_ballots,
+        stratified=stratified,
+        sampler_seed=sampler.seed,
+        call_stats=call_stats,
+        ballots=state.ballots,
         convergence=convergence,
     )
 
 
+# ── Committee scheduling ───────────────────────────────────────────
+
+# One provider request: (archetype, provider, iterations it fills one ballot each for)
+Call = tuple[Archetype, LLMProvider, list[int]]
+
+
+def _plan_calls(
+    sampler: CommitteeSampler,
+    committee_size: int,
+    iterations: range,
+) -> list[Call]:
+    """Sample committees for a block of iterations and merge repeated seats.
+
+    Seats with the same archetype and provider in several iterations of the
+    block share one `evaluate_many` request for n completions, so the
+    evidence prompt is sent once instead of n times.
+    """
+    calls: dict[tuple[str, int], Call] = {}
+    for i in iterations:
+        for arch, provider in sampler.sample(committee_size):
+            key = (arch.name, id(provider))
+            if key not in calls:
+                calls[key] = (arch, provider, [])
+            calls[key][2].append(i)
+    return list(calls.values())
+
+
+async def _submit_batches(
+    prompt: BundlePrompt,
+    call_policy: CallPolicy,
+    calls: list[Call],
+) -> list[list[Ballot | None]]:
+    """One `evaluate_batch` per batch-capable provider; calls to other providers go
+    out separately. Results come back in `calls` order."""
+    groups: dict[int, list[int]] = defaultdict(list)
+    singles: list[int] = []
+    for k, (_, provider, _) in enumerate(calls):
+        if provider.supports_batch:
+            groups[id(provider)].append(k)
+        else:
+            singles.append(k)
+    batches, separate = await asyncio.gather(
+        asyncio.gather(*(
+            evaluate_batch(calls[ks[0]][1], prompt, [(calls[k][0], calls[k][2]) for k in ks], call_policy)
+            for ks in groups.values()
+        )),
+        asyncio.gather(*(
+            evaluate_many(calls[k][0], calls[k][1], prompt, calls[k][2], call_policy) for k in singles
+        )),
+    )
+    results: list[list[Ballot | None]] = [[] for _ in calls]
+    for ks, batch in zip(groups.values(), batches):
+        for k, ballots in zip(ks, batch):
+            results[k] = ballots
+    for k, ballots in zip(singles, separate):
+        results[k] = ballots
+    return results
+
+
+async def _lockstep_iterations(
+    prompt: BundlePrompt,
+    call_policy: CallPolicy,
+    num_iterations: int,
+    committee_size: int,
+    sampler: CommitteeSampler,
+    completions_per_request: int,
+    batch_submit: bool = False,
+) -> AsyncIterator[tuple[int, list[Ballot]]]:
+    """Run one block of committees at a time; each block waits for its slowest call.
+
+    With `batch_submit`, each provider with a batch endpoint receives the
+    block's calls through `complete_batch` instead of separate requests.
+    """
+    for first in range(1, num_iterations + 1, completions_per_request):
+        block = range(first, min(first + completions_per_request, num_iterations + 1))
+        calls = _plan_calls(sampler, committee_size, block)
+
+        # Run all agents in this block in parallel
+        if batch_submit:
+            results = await _submit_batches(prompt, call_policy, calls)
+        else:
+            results = await asyncio.gather(*(
+                evaluate_many(arch, provider, prompt, iterations, call_policy)
+                for arch, provider, iterations in calls
+            ))
+        finished: dict[int, list[Ballot]] = defaultdict(list)
+        for (_, _, iterations), ballots in zip(calls, results):
+            for i, ballot in zip(iterations, ballots):
+                if ballot is not None:
+                    finished[i].append(ballot)
+        for i in block:
+            yield i, finished[i]
+
+
+async def _pipelined_iterations(
+    prompt: BundlePrompt,
+    call_policy: CallPolicy,
+    num_iterations: int,
+    committee_size: int,
+    sampler: CommitteeSampler,
+    max_in_flight: int,
+    completions_per_request: int,
+) -> AsyncIterator[tuple[int, list[Ballot]]]:
+    """Keep up to `max_in_flight` provider requests running across iteration boundaries.
+
+    Committees are sampled ahead of time into a sliding window, so a slow call
+    only delays the snapshot of its own iterations while later iterations keep
+    making progress. Sampling runs at most `max_in_flight // committee_size`
+    iterations ahead of the oldest unfinished one (at least one block of
+    `completions_per_request`), which bounds the calls wasted after an early
+    stop. Each ballot keeps the iteration its committee was
+    sampled for, and iterations are yielded strictly in order once all their
+    calls have finished. Calls still in flight are cancelled when the consumer
+    stops early.
+    """
+    if max_in_flight < 1:
+        raise ValueError(f"max_in_flight must be >= 1, got {max_in_flight}")
+    lookahead = max(completions_per_request, max_in_flight // max(1, committee_size))
+
+    backlog: deque[Call] = deque()
+    outstanding: dict[int, int] = defaultdict(int)   # iteration -> calls not yet finished
+    finished: dict[int, list[Ballot]] = defaultdict(list)
+    in_flight: dict[asyncio.Task, Call] = {}
+    next_sampled = 1
+    next_yielded = 1
+
+    try:
+        while next_yielded <= num_iterations:
+            # Top up the window, sampling new committees as the backlog drains
+            while len(in_flight) < max_in_flight:
+                if not backlog:
+                    # Sample whole blocks so seats keep merging into n-completion requests
+                    last = min(num_iterations, next_sampled + completions_per_request - 1)
+                    if next_sampled > num_iterations or last > next_yielded + lookahead:
+                        break
+                    block = range(next_sampled, last + 1)
+                    for i in block:
+                        outstanding[i] = 0
+                    for call in _plan_calls(sampler, committee_size, block):
+                        for i in call[2]:
+                            outstanding[i] += 1
+                        backlog.append(call)
+                    next_sampled = last + 1
+                    continue
+                call = backlog.popleft()
+                arch, provider, iterations = call
+                task = asyncio.create_task(evaluate_many(arch, provider, prompt, iterations, call_policy))
+                in_flight[task] = call
+
+            if next_yielded < next_sampled and outstanding[next_yielded] == 0:
+                del outstanding[next_yielded]
+                yield next_yielded, finished.pop(next_yielded, [])
+                next_yielded += 1
+                continue
+
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                _, _, iterations = in_flight.pop(task)
+                for i, ballot in zip(iterations, task.result()):
+                    outstanding[i] -= 1
+                    if ballot is not None:
+                        finished[i].append(ballot)
+    finally:
+        for task in in_flight:
+            task.cancel()
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+            logger.info("Cancelled %d in-flight calls", len(in_flight))
+
+
+def _iterations(
+    prompt: BundlePrompt,
+    call_policy: CallPolicy,
+    num_iterations: int,
+    committee_size: int,
+    sampler: CommitteeSampler,
+    max_in_flight: int | None,
+    completions_per_request: int,
+    batch_submit: bool,
+) -> AsyncIterator[tuple[int, list[Ballot]]]:
+    """Pick the committee scheduler: lockstep by default, pipelined if a window is set."""
+    if completions_per_request < 1:
+        raise ValueError(f"completions_per_request must be >= 1, got {completions_per_request}")
+    if batch_submit and max_in_flight is not None:
+        raise ValueError(
+            "batch_submit applies to the lockstep scheduler only; "
+            "the pipelined window already submits each call as soon as it is sampled"
+        )
+    if max_in_flight is None:
+        return _lockstep_iterations(
+            prompt, call_policy, num_iterations, committee_size, sampler, completions_per_request, batch_submit,
+        )
+    return _pipelined_iterations(
+        prompt, call_policy, num_iterations, committee_size, sampler, max_in_flight, completions_per_request,
+    )
+
+
 async def run_swarm(
     bundle: EvidenceBundle,
     num_iterations: int = NUM_ITERATIONS,
     committee_size: int = COMMITTEE_SIZE,
     archetypes: list[Archetype] | None = None,
     providers: list[LLMProvider] | None = None,
+    max_in_flight: int | None = MAX_IN_FLIGHT,
+    stopping: str | StoppingPolicy | None = None,
+    sampler: CommitteeSampler | None = None,
+    cache_mode: str = LLM_CACHE_MODE,
+    completions_per_request: int = COMPLETIONS_PER_REQUEST,
+    call_policy: CallPolicy | None = None,
+    batch_submit: bool = BATCH_SUBMIT,
 ) -> VerdictDistribution:
     """Run the full Monte Carlo committee sampling loop and return a verdict."""
-    archetypes = archetypes or ALL_ARCHETYPES
-    providers = providers or get_available_providers()
-
-    all_ballots: list[Ballot] = []
-    convergence: list[ConvergenceSnapshot] = []
-    converged_at: int | None = None
-    patience_count = 0
-
-    for i in range(1, num_iterations + 1):
-        committee = sample_committee(archetypes, providers, committee_size)
-
-        # Run all agents in this committee in parallel
-        tasks = [
-            evaluate(arch, provider, bundle, iteration=i)
-            for arch, provider in committee
-        ]
-        results = await asyncio.gather(*tasks)
-
-        for ballot in results:
-            if ballot is not None:
-                all_ballots.append(ballot)
-
-        snapshot = convergence_snapshot(i, all_ballots)
-        convergence.append(snapshot)
-        logger.info(
-            "Iteration %d/%d — P(YES)=%.3f P(NO)=%.3f P(NULL)=%.3f (%d total ballots)",
-            i, num_iterations, snapshot.p_yes, snapshot.p_no, snapshot.p_null, len(all_ballots),
-        )
-
-        # #3: KL divergence early stopping (only after enough ballots)
-        if len(all_ballots) >= MIN_BALLOTS_FOR_CONVERGENCE and len(convergence) >= 2:
-            prev = convergence[-2]
-            curr = convergence[-1]
-            kl = kl_divergence(
-                (curr.p_yes, curr.p_no, curr.p_null),
-                (prev.p_yes, prev.p_no, prev.p_null),
-            )
-            if kl < CONVERGENCE_THRESHOLD:
-                patience_count += 1
-                if patience_count >= CONVERGENCE_PATIENCE:
-                    converged_at = i
-                    logger.info("Converged at iteration %d (KL=%.6f)", i, kl)
-                    break
-            else:
-                patience_count = 0
-
-    return _build_verdict(bundle, all_ballots, convergence, num_iterations, committee_size, converged_at)
+    stream = stream_swarm(
+        bundle, num_iterations, committee_size, archetypes, providers, max_in_flight, stopping, sampler,
+        cache_mode, completions_per_request, call_policy, batch_submit,
+    )
+    async with aclosing(stream):
+        async for item in stream:
+            if isinstance(item, VerdictDistribution):
+                return item
+    raise RuntimeError("stream_swarm ended without a verdict")
 
 
 async def stream_swarm(
@@ -117,46 +302,86 @@ async def stream_swarm(
     committee_size: int = COMMITTEE_SIZE,
     archetypes: list[Archetype] | None = None,
     providers: list[LLMProvider] | None = None,
+    max_in_flight: int | None = MAX_IN_FLIGHT,
+    stopping: str | StoppingPolicy | None = None,
+    sampler: CommitteeSampler | None = None,
+    cache_mode: str = LLM_CACHE_MODE,
+    completions_per_request: int = COMPLETIONS_PER_REQUEST,
+    call_policy: CallPolicy | None = None,
+    batch_submit: bool = BATCH_SUBMIT,
 ) -> AsyncIterator[ConvergenceSnapshot | VerdictDistribution]:
-    """Stream convergence snapshots per iteration, then yield the final verdict."""
-    archetypes = archetypes or ALL_ARCHETYPES
-    providers = providers or get_available_providers()
+    """Stream convergence snapshots per iteration, then yield the final verdict.
+
+    This is the single swarm engine; `run_swarm` just drains it. `stopping`
+    names a policy from `swarm.stopping` (default `STOPPING_POLICY`) or is a
+    policy instance. `sampler` overrides the configured committee sampler
+    (`SAMPLER`), in which case `archetypes`, `providers` and `cache_mode` are
+    ignored. `cache_mode` routes calls through the response cache ("read") or
+    serves them only from it ("replay"); the first cached run of a bundle
+    records its prompt date and sampler seed, and later runs of that bundle
+    reuse both so they replay the same requests. `completions_per_request` > 1 asks
+    each provider for that many completions per request, spreading one
+    (archetype, provider) prompt over up to that many consecutive iterations.
+    `call_policy` sets deadlines, retries and hedging (a fresh `CallPolicy`
+    from config by default); its counts land in the verdict's `call_stats`.
+    `batch_submit` (lockstep only; an error with `max_in_flight`) sends each
+    block's calls to a provider with a batch endpoint (`supports_batch`) as
+    multi-prompt requests, which suits self-hosted batching servers.
+    """
+    recording = None
+    record = sampler is None and cache_mode != "off"
+    if sampler is None:
+        archetypes = archetypes or ALL_ARCHETYPES
+        providers = with_response_cache(providers or get_available_providers(), cache_mode)
+        seed = SAMPLER_SEED
+        if record:
+            # Runs over a recorded bundle reuse its prompt date and committee seed,
+            # so every request they make matches a stored response
+            recording = load_recording(bundle, cache_mode)
+            if recording is not None:
+                seed = recording.sampler_seed
+            elif seed is None:
+                seed = random.randrange(2**32)
+        # Adaptive routing follows live statistics that a seed cannot replay, so cached runs route uniformly
+        sampler = make_sampler(archetypes, providers, seed=seed, routing="uniform" if record else ROUTING)
+    policy = make_stopping_policy(stopping)
 
-    all_ballots: list[Ballot] = []
+    # A stratified design is estimated per archetype, then weighted by the target shares
+    weights = sampler.weights if isinstance(sampler, StratifiedSampler) and STRATIFIED_ESTIMATE else None
+    state = AggregatorState(weights)
     convergence: list[ConvergenceSnapshot] = []
     converged_at: int | None = None
-    patience_count = 0
-
-    for i in range(1, num_iterations + 1):
-        committee = sample_committee(archetypes, providers, committee_size)
-        tasks = [
-            evaluate(arch, provider, bundle, iteration=i)
-            for arch, provider in committee
-        ]
-        results = await asyncio.gather(*tasks)
-
-        for ballot in results:
-            if ballot is not None:
-                all_ballots.append(ballot)
-
-        snapshot = convergence_snapshot(i, all_ballots)
-        convergence.append(snapshot)
-        yield snapshot
-
-        # #3: KL divergence early stopping (only after enough ballots)
-        if len(all_ballots) >= MIN_BALLOTS_FOR_CONVERGENCE and len(convergence) >= 2:
-            prev = convergence[-2]
-            curr = convergence[-1]
-            kl = kl_divergence(
-                (curr.p_yes, curr.p_no, curr.p_null),
-                (prev.p_yes, prev.p_no, prev.p_null),
+    stop_reason: str | None = None
+
+    # Render the evidence prompt once; every call in the run shares it
+    prompt = render_bundle_prompt(bundle, today=recording.today if recording is not None else None)
+    if record and recording is None:
+        save_recording(bundle, RunRecording(today=prompt.today, sampler_seed=sampler.seed))
+    call_policy = call_policy or CallPolicy()
+    iterations = _iterations(
+        prompt, call_policy, num_iterations, committee_size, sampler, max_in_flight, completions_per_request,
+        batch_submit,
+    )
+    async with aclosing(iterations):
+        async for i, results in iterations:
+            state.extend(results)
+
+            snapshot = state.snapshot(i)
+            convergence.append(snapshot)
+            logger.info(
+                "Iteration %d/%d — P(YES)=%.3f P(NO)=%.3f P(NULL)=%.3f (%d total ballots)",
+                i, num_iterations, snapshot.p_yes, snapshot.p_no, snapshot.p_null, state.n,
             )
-            if kl < CONVERGENCE_THRESHOLD:
-                patience_count += 1
-                if patience_count >= CONVERGENCE_PATIENCE:
-                    converged_at = i
-                    break
-            else:
-                patience_count = 0
-
-    yield _build_verdict(bundle, all_ballots, convergence, num_iterations, committee_size, converged_at)
+            yield snapshot
+
+            decision = policy.check(state, convergence)
+            if decision.stop:
+                converged_at = i
+                stop_reason = f"{policy.name}: {decision.reason}"
+                logger.info("Stopped at iteration %d (%s)", i, stop_reason)
+                break
+
+    yield _build_verdict(
+        bundle, state, convergence, num_iterations, committee_size, converged_at, stop_reason, sampler,
+        call_policy.stats,
+    )
@@ -1,21 +1,154 @@
 from __future__ import annotations
 
 import random
+from abc import ABC, abstractmethod
 
 from swarm.archetypes import Archetype
+from swarm.config import ARCHETYPE_WEIGHTS, ROUTING, SAMPLER, SAMPLER_SEED
 from swarm.models import LLMProvider
+from swarm.routing import ProviderRouter, get_router
 
 
 def sample_committee(
     archetypes: list[Archetype],
     providers: list[LLMProvider],
     committee_size: int,
+    rng: random.Random | None = None,
+    router: ProviderRouter | None = None,
 ) -> list[tuple[Archetype, LLMProvider]]:
     """Sample a random committee of (archetype, provider) pairs.
 
     Archetypes are sampled without replacement (for diversity within a committee).
-    Each selected archetype is randomly assigned a provider from the pool.
+    Each selected archetype is randomly assigned a provider from the pool, or
+    by `router` from live latency, error and cost statistics.
     """
+    rng = rng or random
     size = min(committee_size, len(archetypes))
-    selected = random.sample(archetypes, size)
-    return [(arch, random.choice(providers)) for arch in selected]
+    selected = rng.sample(archetypes, size)
+    if router is not None:
+        return list(zip(selected, router.assign(providers, size, rng)))
+    return [(arch, rng.choice(providers)) for arch in selected]
+
+
+class CommitteeSampler(ABC):
+    """Produces one committee per iteration; a run's schedule is fixed by its seed
+    (except for adaptively routed providers, see `make_sampler`)."""
+
+    def __init__(
+        self,
+        archetypes: list[Archetype],
+        providers: list[LLMProvider],
+        seed: int | None = None,
+    ):
+        self.archetypes = archetypes
+        self.providers = providers
+        # Always draw a concrete seed so the schedule can be replayed from the verdict
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self._rng = random.Random(self.seed)
+
+    @abstractmethod
+    def sample(self, committee_size: int) -> list[tuple[Archetype, LLMProvider]]:
+        ...
+
+
+class RandomSampler(CommitteeSampler):
+    """Independent uniform committees each iteration (`sample_committee`).
+
+    With a `router`, providers are picked adaptively instead of uniformly.
+    """
+
+    def __init__(
+        self,
+        archetypes: list[Archetype],
+        providers: list[LLMProvider],
+        seed: int | None = None,
+        router: ProviderRouter | None = None,
+    ):
+        super().__init__(archetypes, providers, seed)
+        self.router = router
+
+    def sample(self, committee_size: int) -> list[tuple[Archetype, LLMProvider]]:
+        return sample_committee(self.archetypes, self.providers, committee_size, self._rng, self.router)
+
+
+class StratifiedSampler(CommitteeSampler):
+    """Balanced allocation of archetype × provider pairs across iterations.
+
+    Each iteration seats the archetypes furthest behind their target share
+    (`weights`, uniform by default), so after t iterations every archetype's
+    seat count is within one of its target instead of drifting like
+    independent draws. Each archetype walks a cyclic shift of one shuffled
+    provider order, so archetypes × providers form a Latin square and the
+    pairs spread evenly too. Ties are broken by the seeded RNG. The runner
+    estimates the verdict with `AggregatorState.stratified_distribution`
+    (see `STRATIFIED_ESTIMATE`).
+    """
+
+    def __init__(
+        self,
+        archetypes: list[Archetype],
+        providers: list[LLMProvider],
+        weights: dict[str, float] | None = None,
+        seed: int | None = None,
+    ):
+        super().__init__(archetypes, providers, seed)
+        raw = {a.name: (weights or {}).get(a.name, 0.0 if weights else 1.0) for a in archetypes}
+        total = sum(raw.values())
+        if total <= 0:
+            raise ValueError("Archetype weights must include at least one positive weight")
+        self.weights = {name: w / total for name, w in raw.items()}
+
+        self._seats = {a.name: 0 for a in archetypes}
+        self._slots = 0
+        # One shuffled base order; archetype i starts i places along it (a Latin square)
+        base = list(providers)
+        self._rng.shuffle(base)
+        self._rotations = {}
+        for offset, arch in enumerate(archetypes):
+            k = offset % len(base)
+            self._rotations[arch.name] = base[k:] + base[:k]
+
+    def sample(self, committee_size: int) -> list[tuple[Archetype, LLMProvider]]:
+        eligible = [a for a in self.archetypes if self.weights[a.name] > 0]
+        size = min(committee_size, len(eligible))
+        self._slots += size
+
+        # Largest deficit (target seats - seats so far) first, random tie-break
+        ranked = sorted(
+            eligible,
+            key=lambda a: (self._seats[a.name] - self.weights[a.name] * self._slots, self._rng.random()),
+        )
+        committee = []
+        for arch in ranked[:size]:
+            rotation = self._rotations[arch.name]
+            provider = rotation[self._seats[arch.name] % len(rotation)]
+            self._seats[arch.name] += 1
+            committee.append((arch, provider))
+        return committee
+
+
+def make_sampler(
+    archetypes: list[Archetype],
+    providers: list[LLMProvider],
+    kind: str = SAMPLER,
+    seed: int | None = SAMPLER_SEED,
+    weights: dict[str, float] | None = ARCHETYPE_WEIGHTS,
+    routing: str = ROUTING,
+    router: ProviderRouter | None = None,
+) -> CommitteeSampler:
+    """Build a committee sampler by name ("random" or "stratified").
+
+    `routing="adaptive"` makes the random sampler pick providers with
+    `router` (the process-wide one by default). Adaptive picks depend on live
+    latency and cost statistics, so the seed then reproduces which archetypes
+    sit on each committee but not which provider (model) serves each seat.
+    The stratified sampler keeps its balanced provider rotation either way.
+    """
+    if routing not in ("uniform", "adaptive"):
+        raise ValueError(f"Unknown routing {routing!r}; choose 'uniform' or 'adaptive'")
+    if kind == "stratified":
+        return StratifiedSampler(archetypes, providers, weights=weights, seed=seed)
+    if kind == "random":
+        router = (router or get_router()) if routing == "adaptive" else None
+        return RandomSampler(archetypes, providers, seed=seed, router=router)
+    raise ValueError(f"Unknown sampler {kind!r}; choose 'random' or 'stratified'")
@@ -19,6 +19,20 @@ class EvidenceBundle(BaseModel):
     rubric: list[str]
     evidence: list[EvidenceItem]
     merkle_root: str
+    merkle_version: int = 1          # leaf encoding and node hashing scheme (evidence.merkle)
+    evidence_cache_age_s: float | None = None  # age of the oldest cached search result behind it (None = all fresh)
+
+
+class MerkleProof(BaseModel):
+    """Inclusion proof of one evidence item under a bundle's Merkle root."""
+
+    merkle_root: str
+    merkle_version: int = 1
+    evidence_id: int
+    leaf_index: int                  # the question is leaf 0
+    leaf_count: int                  # leaves in the tree, question included; verifiers reject leaf_index >= this
+    leaf: str                        # hash_leaf(encode_item(item, merkle_version)), as in bundle_leaves()
+    proof: list[str]                 # sibling hashes, leaf level first; even index = left child
 
 
 # ── Ballots ─────────────────────────────────────────────────────────
@@ -38,6 +52,8 @@ class Ballot(BaseModel):
     refuting_evidence_ids: list[int] = Field(default_factory=list)
     rubric_scores: dict[str, float] = Field(default_factory=dict)
     reasoning: str = ""
+    prompt_tokens: int | None = None                     # input tokens of the request (first ballot of an n-request)
+    cached_prompt_tokens: int | None = None              # of which were provider prefix-cache hits
 
 
 # ── Aggregated output ───────────────────────────────────────────────
@@ -49,6 +65,21 @@ class ConvergenceSnapshot(BaseModel):
     p_null: float
 
 
+class CallStats(BaseModel):
+    """Outcome counts for one run's provider requests."""
+    calls: int = 0              # logical evaluate calls
+    attempts: int = 0           # requests sent, including retries and hedges
+    succeeded: int = 0
+    failed: int = 0             # gave up after retries; the ballots were dropped
+    timeouts: int = 0           # attempts that hit the per-call deadline
+    errors: int = 0             # attempts that raised
+    retries: int = 0
+    retries_denied: int = 0     # retries skipped because the run's budget was spent
+    hedges: int = 0             # duplicate requests sent after the hedge delay
+    hedge_wins: int = 0         # hedged requests that answered first
+    malformed: int = 0          # completions that did not parse into a ballot
+
+
 class VerdictDistribution(BaseModel):
     question: str
     p_yes: float                                         # posterior mean from Dirichlet
@@ -57,9 +88,29 @@ class VerdictDistribution(BaseModel):
     num_iterations: int
     committee_size: int
     converged_at_iteration: int | None                   # null if didn't converge early
+    stop_reason: str | None = None                       # why the stopping policy ended the run
     credible_intervals_95: dict[str, tuple[float, float]]  # CIs for all 3 outcomes
     entropy: float
     fleiss_kappa: float                                  # inter-rater reliability
     effective_sample_size: float                         # discounted for model correlation
+    stratified: dict[str, float] | None = None           # post-stratified estimate (stratified sampler only)
+    sampler_seed: int | None = None                      # replays the committee schedule
+    call_stats: CallStats | None = None                  # retries, timeouts and hedges for this run
     ballots: list[Ballot]
     convergence: list[ConvergenceSnapshot]
+
+
+# ── Jobs ────────────────────────────────────────────────────────────
+
+class JobInfo(BaseModel):
+    """Status of a background swarm job."""
+    id: str
+    kind: str                               # "evaluate" (a bundle) or "resolve" (a question)
+    status: str                             # queued, running, succeeded, failed or cancelled
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+    queue_position: int | None = None       # 1-based, while queued
+    events: int = 0                         # events emitted so far; replay with /jobs/{id}/events
+    last_snapshot: dict | None = None       # latest convergence snapshot
+    error: str | None = None
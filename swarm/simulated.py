@@ -0,0 +1,157 @@
+"""Deterministic simulated LLM provider for benchmarks and offline runs."""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import re
+from dataclasses import dataclass
+
+from swarm.archetypes import ALL_ARCHETYPES
+from swarm.config import CHARS_PER_TOKEN, TEMPERATURE
+from swarm.models import CompletionRequest, LLMProvider, LLMResponse
+
+# P(YES), P(NO), P(NULL) per archetype — rough caricatures of each prompt's bias
+DEFAULT_VOTE_PROBS: dict[str, tuple[float, float, float]] = {
+    "strict_empiricist": (0.50, 0.20, 0.30),
+    "permissive_interpreter": (0.70, 0.25, 0.05),
+    "skeptic": (0.25, 0.15, 0.60),
+    "source_quality_hawk": (0.55, 0.20, 0.25),
+    "contrarian": (0.35, 0.50, 0.15),
+}
+UNKNOWN_ARCHETYPE_PROBS = (0.45, 0.35, 0.20)
+
+# The first line of each archetype prompt ("You are a SKEPTIC evaluator. ...") identifies it
+_ARCHETYPE_MARKERS = [(a.system_prompt.splitlines()[0], a.name) for a in ALL_ARCHETYPES]
+
+
+@dataclass
+class LatencyModel:
+    """Lognormal call latency with an optional hard timeout.
+
+    `median_s` is the median latency, `sigma` the lognormal shape (larger =
+    heavier tail). Calls whose sampled latency exceeds `timeout_s` wait out
+    the timeout and raise `TimeoutError`, like a client-side deadline.
+    """
+
+    median_s: float = 0.8
+    sigma: float = 0.5
+    timeout_s: float | None = 30.0
+
+    def sample(self, rng: random.Random) -> float:
+        return self.median_s * rng.lognormvariate(0.0, self.sigma)
+
+
+class SimulatedProvider(LLMProvider):
+    """Produces archetype-conditioned JSON ballots without any network calls.
+
+    The archetype is recognised from its prompt text; votes are drawn from
+    `vote_probs`, cited evidence ids and rubric criteria are read back from
+    the prompt. Latency, error and malformed-JSON behaviour are configurable
+    and every draw comes from one seeded RNG, so a run is reproducible given
+    the same call order. Token usage is estimated from prompt length, and a
+    system message seen before counts as a prefix-cache hit.
+    """
+
+    def __init__(
+        self,
+        model: str = "simulated",
+        latency: LatencyModel | None = None,
+        error_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        vote_probs: dict[str, tuple[float, float, float]] | None = None,
+        seed: int | None = None,
+    ):
+        self._model = model
+        self.latency = latency or LatencyModel()
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.vote_probs = vote_probs or DEFAULT_VOTE_PROBS
+        self._rng = random.Random(seed)
+        self.calls = 0
+        self._seen_prefixes: set[str] = set()
+
+    @property
+    def model_id(self) -> str:
+        return self._model
+
+    @property
+    def supports_batch(self) -> bool:
+        return True
+
+    async def complete(
+        self, system: str, user: str, temperature: float = TEMPERATURE, n: int = 1,
+    ) -> LLMResponse:
+        self.calls += 1
+        rng = self._rng
+        # Draw everything up front so outcomes don't depend on task interleaving
+        delay = self.latency.sample(rng)
+        failed = rng.random() < self.error_rate
+        choices = self._draw_choices(system, user, n, rng)
+        await self._wait(delay, failed)
+        return self._response(system, user, choices)
+
+    async def complete_batch(
+        self, requests: list[CompletionRequest], timeout_s: float | None = None,
+    ) -> list[LLMResponse | Exception]:
+        """The whole batch is one request: one latency, one error draw, one deadline."""
+        self.calls += 1
+        rng = self._rng
+        delay = self.latency.sample(rng)
+        failed = rng.random() < self.error_rate
+        choices = [self._draw_choices(r.system, r.user, r.n, rng) for r in requests]
+        try:
+            await asyncio.wait_for(self._wait(delay, failed), timeout_s)
+        except Exception as exc:
+            return [exc] * len(requests)
+        return [self._response(r.system, r.user, c) for r, c in zip(requests, choices)]
+
+    def _draw_choices(self, system: str, user: str, n: int, rng: random.Random) -> list[str]:
+        choices = []
+        for _ in range(n):
+            content = self._ballot_json(system + "\n" + user, rng)
+            if rng.random() < self.malformed_rate:
+                content = "Sure! Here is my verdict: " + content[: len(content) // 2]
+            choices.append(content)
+        return choices
+
+    async def _wait(self, delay: float, failed: bool) -> None:
+        timeout = self.latency.timeout_s
+        if timeout is not None and delay > timeout:
+            await asyncio.sleep(timeout)
+            raise TimeoutError(f"Simulated timeout after {timeout:.2f}s")
+        await asyncio.sleep(delay)
+        if failed:
+            raise RuntimeError("Simulated provider error")
+
+    def _response(self, system: str, user: str, choices: list[str]) -> LLMResponse:
+        cached = len(system) // CHARS_PER_TOKEN if system in self._seen_prefixes else 0
+        self._seen_prefixes.add(system)
+        return LLMResponse(
+            content=choices[0],
+            model=self._model,
+            choices=choices,
+            prompt_tokens=(len(system) + len(user)) // CHARS_PER_TOKEN,
+            cached_tokens=cached,
+            completion_tokens=sum(len(c) for c in choices) // CHARS_PER_TOKEN,
+        )
+
+    def _ballot_json(self, prompt: str, rng: random.Random) -> str:
+        archetype = next((name for marker, name in _ARCHETYPE_MARKERS if marker in prompt), None)
+        probs = self.vote_probs.get(archetype, UNKNOWN_ARCHETYPE_PROBS)
+        vote = rng.choices(("YES", "NO", "NULL"), weights=probs)[0]
+
+        evidence_ids = [int(i) for i in re.findall(r"\[Evidence (\d+)\]", prompt)]
+        cited = rng.sample(evidence_ids, min(len(evidence_ids), rng.randint(1, 3))) if evidence_ids else []
+        split = rng.randint(0, len(cited))
+
+        rubric_match = re.search(r"EVALUATION RUBRIC: (.*)", prompt)
+        rubric = [c.strip() for c in rubric_match.group(1).split(",")] if rubric_match else []
+
+        return json.dumps({
+            "vote": vote,
+            "supporting_evidence_ids": cited[:split],
+            "refuting_evidence_ids": cited[split:],
+            "rubric_scores": {c: round(rng.random(), 2) for c in rubric},
+            "reasoning": f"Simulated {archetype or 'unknown'} ballot.",
+        })
@@ -0,0 +1,203 @@
+"""Stopping policies — decide after each iteration whether the swarm can stop early."""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+import numpy as np
+
+from swarm.aggregator import AggregatorState, kl_divergence
+from swarm.config import (
+    CI_WIDTH_TARGET,
+    CONVERGENCE_PATIENCE,
+    CONVERGENCE_THRESHOLD,
+    MIN_BALLOTS_FOR_CONVERGENCE,
+    SPRT_CONFIDENCE,
+    STABLE_PATIENCE,
+    STOPPING_POLICY,
+)
+from swarm.intervals import beta_cdf, dirichlet_intervals
+from swarm.schemas import ConvergenceSnapshot
+
+OUTCOMES = ("YES", "NO", "NULL")
+
+
+@dataclass
+class StopDecision:
+    stop: bool
+    reason: str = ""
+
+
+class StoppingPolicy(ABC):
+    """Checked once per finished iteration; policies may keep state across checks."""
+
+    name: str
+
+    def __init__(self, min_ballots: int = MIN_BALLOTS_FOR_CONVERGENCE):
+        self.min_ballots = min_ballots
+
+    @abstractmethod
+    def check(self, state: AggregatorState, convergence: list[ConvergenceSnapshot]) -> StopDecision:
+        ...
+
+
+def _alpha(state: AggregatorState) -> np.ndarray:
+    """Dirichlet posterior parameters under the uniform (1, 1, 1) prior."""
+    return np.array(state.vote_counts()) + 1.0
+
+
+# ── KL patience (original rule) ────────────────────────────────────
+
+class KLPatience(StoppingPolicy):
+    """Stop after `patience` consecutive snapshot-to-snapshot KL values below `threshold`."""
+
+    name = "kl"
+
+    def __init__(
+        self,
+        threshold: float = CONVERGENCE_THRESHOLD,
+        patience: int = CONVERGENCE_PATIENCE,
+        min_ballots: int = MIN_BALLOTS_FOR_CONVERGENCE,
+    ):
+        super().__init__(min_ballots)
+        self.threshold = threshold
+        self.patience = patience
+        self._count = 0
+
+    def check(self, state: AggregatorState, convergence: list[ConvergenceSnapshot]) -> StopDecision:
+        if state.n < self.min_ballots or len(convergence) < 2:
+            return StopDecision(False)
+        prev, curr = convergence[-2], convergence[-1]
+        kl = kl_divergence(
+            (curr.p_yes, curr.p_no, curr.p_null),
+            (prev.p_yes, prev.p_no, prev.p_null),
+        )
+        if kl >= self.threshold:
+            self._count = 0
+            return StopDecision(False)
+        self._count += 1
+        if self._count >= self.patience:
+            return StopDecision(True, f"KL={kl:.6f} < {self.threshold} for {self.patience} iterations")
+        return StopDecision(False)
+
+
+# ── Credible-interval width ────────────────────────────────────────
+
+class CredibleWidth(StoppingPolicy):
+    """Stop once every outcome's 95% credible interval is at most `max_width` wide."""
+
+    name = "ci_width"
+
+    def __init__(self, max_width: float = CI_WIDTH_TARGET, min_ballots: int = MIN_BALLOTS_FOR_CONVERGENCE):
+        super().__init__(min_ballots)
+        self.max_width = max_width
+
+    def check(self, state: AggregatorState, convergence: list[ConvergenceSnapshot]) -> StopDecision:
+        if state.n < self.min_ballots:
+            return StopDecision(False)
+        lo, hi = dirichlet_intervals(_alpha(state), level=0.95)
+        width = float(np.max(hi - lo))
+        if width <= self.max_width:
+            return StopDecision(True, f"max 95% CI width {width:.3f} <= {self.max_width}")
+        return StopDecision(False)
+
+
+# ── Bayesian sequential test on P(YES) > P(NO) ─────────────────────
+
+class BayesianSPRT(StoppingPolicy):
+    """Stop once P(theta_yes > theta_no | ballots) leaves [1 - confidence, confidence].
+
+    Under the Dirichlet posterior theta_yes / (theta_yes + theta_no) is
+    Beta(alpha_yes, alpha_no), so the posterior probability is one Beta CDF.
+    """
+
+    name = "sprt"
+
+    def __init__(self, confidence: float = SPRT_CONFIDENCE, min_ballots: int = MIN_BALLOTS_FOR_CONVERGENCE):
+        super().__init__(min_ballots)
+        self.confidence = confidence
+
+    def check(self, state: AggregatorState, convergence: list[ConvergenceSnapshot]) -> StopDecision:
+        if state.n < self.min_ballots:
+            return StopDecision(False)
+        alpha = _alpha(state)
+        p_yes_wins = 1.0 - float(beta_cdf(0.5, alpha[0], alpha[1]))
+        if p_yes_wins >= self.confidence:
+            return StopDecision(True, f"P(YES > NO) = {p_yes_wins:.4f} >= {self.confidence}")
+        if p_yes_wins <= 1.0 - self.confidence:
+            return StopDecision(True, f"P(NO > YES) = {1.0 - p_yes_wins:.4f} >= {self.confidence}")
+        return StopDecision(False)
+
+
+# ── Stable decision ────────────────────────────────────────────────
+
+class DecisionStable(StoppingPolicy):
+    """Stop once the leading outcome beats every other with posterior probability
+    >= `confidence` and has led for `patience` consecutive iterations."""
+
+    name = "stable"
+
+    def __init__(
+        self,
+        confidence: float = SPRT_CONFIDENCE,
+        patience: int = STABLE_PATIENCE,
+        min_ballots: int = MIN_BALLOTS_FOR_CONVERGENCE,
+    ):
+        super().__init__(min_ballots)
+        self.confidence = confidence
+        self.patience = patience
+        self._leader: int | None = None
+        self._streak = 0
+
+    def check(self, state: AggregatorState, convergence: list[ConvergenceSnapshot]) -> StopDecision:
+        alpha = _alpha(state)
+        leader = int(np.argmax(alpha))
+        self._streak = self._streak + 1 if leader == self._leader else 1
+        self._leader = leader
+        if state.n < self.min_ballots or self._streak < self.patience:
+            return StopDecision(False)
+
+        # Pairwise P(theta_leader > theta_other), each a Beta(alpha_l, alpha_o) tail
+        others = np.array([k for k in range(len(alpha)) if k != leader])
+        p_beats = 1.0 - beta_cdf(0.5, alpha[leader], alpha[others])
+        p_min = float(np.min(p_beats))
+        if p_min >= self.confidence:
+            return StopDecision(
+                True,
+                f"{OUTCOMES[leader]} led for {self._streak} iterations, "
+                f"P(beats every other outcome) >= {p_min:.4f}",
+            )
+        return StopDecision(False)
+
+
+# ── Fixed budget ───────────────────────────────────────────────────
+
+class FixedBudget(StoppingPolicy):
+    """Never stop early; always run the full iteration budget."""
+
+    name = "none"
+
+    def check(self, state: AggregatorState, convergence: list[ConvergenceSnapshot]) -> StopDecision:
+        return StopDecision(False)
+
+
+STOPPING_POLICIES: dict[str, type[StoppingPolicy]] = {
+    FixedBudget.name: FixedBudget,
+    KLPatience.name: KLPatience,
+    CredibleWidth.name: CredibleWidth,
+    BayesianSPRT.name: BayesianSPRT,
+    DecisionStable.name: DecisionStable,
+}
+
+
+def make_stopping_policy(policy: str | StoppingPolicy | None = None) -> StoppingPolicy:
+    """Return a fresh policy by name (default `STOPPING_POLICY`), or pass one through."""
+    if isinstance(policy, StoppingPolicy):
+        return policy
+    name = policy or STOPPING_POLICY
+    try:
+        return STOPPING_POLICIES[name]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown stopping policy {name!r}; choose from {sorted(STOPPING_POLICIES)}"
+        ) from None
@@ -0,0 +1,211 @@
+"""Columnar ballot storage for vectorized statistics over large ballot sets."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from swarm.aggregator import compute_entropy, dirichlet_posterior_from_counts
+from swarm.config import CI_METHOD
+from swarm.schemas import Ballot, Vote
+
+VOTES: list[Vote] = [Vote.YES, Vote.NO, Vote.NULL]
+VOTE_CODES: dict[Vote, int] = {v: i for i, v in enumerate(VOTES)}
+
+
+def _encode(values: list[str]) -> tuple[np.ndarray, list[str]]:
+    """Dictionary-encode strings as int32 ids in first-seen order."""
+    index: dict[str, int] = {}
+    ids = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.int32, count=len(values))
+    return ids, list(index)
+
+
+def _ragged(rows: list[list[int]]) -> tuple[np.ndarray, np.ndarray]:
+    """Flatten a list of int lists into (offsets, values); row i is values[offsets[i]:offsets[i+1]]."""
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum([len(r) for r in rows], out=offsets[1:])
+    values = np.fromiter((x for r in rows for x in r), dtype=np.int32, count=int(offsets[-1]))
+    return offsets, values
+
+
+def _optional_ints(values: list[int | None]) -> np.ndarray:
+    """int64 column with -1 standing in for None."""
+    return np.fromiter((-1 if v is None else v for v in values), dtype=np.int64, count=len(values))
+
+
+@dataclass
+class BallotTable:
+    """Ballots as NumPy columns instead of a list of pydantic models.
+
+    Votes are int8 codes (0=YES, 1=NO, 2=NULL, see `VOTES`). Archetype, model
+    and rubric criterion names are dictionary-encoded as int32 ids. Evidence ids
+    and rubric scores are ragged: row i spans `offsets[i]:offsets[i + 1]`.
+    """
+
+    vote: np.ndarray                  # int8
+    iteration: np.ndarray             # int32
+    archetype: np.ndarray             # int32 -> archetypes
+    model: np.ndarray                 # int32 -> models
+    archetypes: list[str]
+    models: list[str]
+    supporting_offsets: np.ndarray    # int64, len n + 1
+    supporting_ids: np.ndarray        # int32
+    refuting_offsets: np.ndarray      # int64, len n + 1
+    refuting_ids: np.ndarray          # int32
+    rubric_offsets: np.ndarray        # int64, len n + 1
+    rubric_keys: np.ndarray           # int32 -> rubric_names
+    rubric_values: np.ndarray         # float64
+    rubric_names: list[str]
+    reasoning: list[str]
+    prompt_tokens: np.ndarray         # int64, -1 = not reported
+    cached_prompt_tokens: np.ndarray  # int64, -1 = not reported
+
+    def __len__(self) -> int:
+        return len(self.vote)
+
+    # ── Conversion ─────────────────────────────────────────────────
+
+    @classmethod
+    def from_ballots(cls, ballots: list[Ballot]) -> BallotTable:
+        n = len(ballots)
+        archetype, archetypes = _encode([b.archetype for b in ballots])
+        model, models = _encode([b.model for b in ballots])
+        supporting_offsets, supporting_ids = _ragged([b.supporting_evidence_ids for b in ballots])
+        refuting_offsets, refuting_ids = _ragged([b.refuting_evidence_ids for b in ballots])
+
+        rubric_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(b.rubric_scores) for b in ballots], out=rubric_offsets[1:])
+        rubric_keys, rubric_names = _encode([k for b in ballots for k in b.rubric_scores])
+        rubric_values = np.fromiter(
+            (v for b in ballots for v in b.rubric_scores.values()),
+            dtype=np.float64,
+            count=int(rubric_offsets[-1]),
+        )
+
+        return cls(
+            vote=np.fromiter((VOTE_CODES[b.vote] for b in ballots), dtype=np.int8, count=n),
+            iteration=np.fromiter((b.iteration for b in ballots), dtype=np.int32, count=n),
+            archetype=archetype,
+            model=model,
+            archetypes=archetypes,
+            models=models,
+            supporting_offsets=supporting_offsets,
+            supporting_ids=supporting_ids,
+            refuting_offsets=refuting_offsets,
+            refuting_ids=refuting_ids,
+            rubric_offsets=rubric_offsets,
+            rubric_keys=rubric_keys,
+            rubric_values=rubric_values,
+            rubric_names=rubric_names,
+            reasoning=[b.reasoning for b in ballots],
+            prompt_tokens=_optional_ints([b.prompt_tokens for b in ballots]),
+            cached_prompt_tokens=_optional_ints([b.cached_prompt_tokens for b in ballots]),
+        )
+
+    def to_ballots(self) -> list[Ballot]:
+        so, si = self.supporting_offsets.tolist(), self.supporting_ids.tolist()
+        ro, ri = self.refuting_offsets.tolist(), self.refuting_ids.tolist()
+        ko, keys, values = self.rubric_offsets.tolist(), self.rubric_keys.tolist(), self.rubric_values.tolist()
+        return [
+            Ballot(
+                iteration=it,
+                archetype=self.archetypes[a],
+                model=self.models[m],
+                vote=VOTES[v],
+                supporting_evidence_ids=si[so[i]:so[i + 1]],
+                refuting_evidence_ids=ri[ro[i]:ro[i + 1]],
+                rubric_scores={self.rubric_names[k]: x for k, x in zip(keys[ko[i]:ko[i + 1]], values[ko[i]:ko[i + 1]])},
+                reasoning=self.reasoning[i],
+                prompt_tokens=pt if pt >= 0 else None,
+                cached_prompt_tokens=ct if ct >= 0 else None,
+            )
+            for i, (v, it, a, m, pt, ct) in enumerate(zip(
+                self.vote.tolist(), self.iteration.tolist(), self.archetype.tolist(), self.model.tolist(),
+                self.prompt_tokens.tolist(), self.cached_prompt_tokens.tolist(),
+            ))
+        ]
+
+    # ── Statistics ─────────────────────────────────────────────────
+
+    def vote_counts(self) -> np.ndarray:
+        """Votes per outcome as an int array (yes, no, null)."""
+        return np.bincount(self.vote, minlength=3)
+
+    def posterior(
+        self,
+        num_samples: int = 10_000,
+        method: str = CI_METHOD,
+        rng: np.random.Generator | None = None,
+    ) -> tuple[tuple[float, float, float], dict[str, tuple[float, float]]]:
+        """Dirichlet posterior mean and 95% credible intervals (see `dirichlet_posterior`)."""
+        counts = tuple(float(c) for c in self.vote_counts())
+        return dirichlet_posterior_from_counts(counts, num_samples, method, rng)
+
+    def entropy(self) -> float:
+        """Shannon entropy (bits) of the posterior mean."""
+        (p_yes, p_no, p_null), _ = self.posterior()
+        return compute_entropy(p_yes, p_no, p_null)
+
+    def fleiss_kappa(self) -> float:
+        """Fleiss' kappa with iterations as subjects (see `aggregator.fleiss_kappa`)."""
+        iterations, subject = np.unique(self.iteration, return_inverse=True)
+        if len(iterations) < 2:
+            return 0.0
+
+        # Rating matrix: rows = iterations, cols = categories
+        matrix = np.bincount(subject * 3 + self.vote, minlength=len(iterations) * 3).reshape(-1, 3)
+        ns = matrix.sum(axis=1)
+
+        # Filter out subjects with < 2 raters
+        valid = ns >= 2
+        if valid.sum() < 2:
+            return 0.0
+        matrix, ns = matrix[valid], ns[valid]
+
+        p_observed = float(np.mean(((matrix * matrix).sum(axis=1) - ns) / (ns * (ns - 1))))
+        p_expected = float(np.sum((matrix.sum(axis=0) / ns.sum()) ** 2))
+
+        if abs(1 - p_expected) < 1e-10:
+            return 1.0  # perfect agreement
+
+        return (p_observed - p_expected) / (1 - p_expected)
+
+    def effective_sample_size(self) -> float:
+        """Design-effect n_eff over model clusters (see `aggregator.effective_sample_size`)."""
+        n = len(self)
+        if not n:
+            return 0.0
+
+        hist = np.bincount(
+            self.model.astype(np.int64) * 3 + self.vote, minlength=len(self.models) * 3,
+        ).reshape(-1, 3)
+        sizes = hist.sum(axis=1)
+        hist, sizes = hist[sizes > 0], sizes[sizes > 0]
+
+        if len(sizes) >= n:
+            return float(n)  # each ballot from different model, no correlation
+
+        clustered = sizes >= 2
+        if not clustered.any():
+            return float(n)
+
+        avg_cluster = n / len(sizes)
+        mean_agreement = float(np.mean(hist[clustered].max(axis=1) / sizes[clustered]))
+        rho = max(0.0, (mean_agreement - 1 / 3) / (1 - 1 / 3))
+
+        deff = 1 + (avg_cluster - 1) * rho
+        return n / deff
+
+    def archetype_breakdown(self) -> dict[str, tuple[int, int, int]]:
+        """Vote counts (yes, no, null) per archetype."""
+        counts = np.bincount(
+            self.archetype.astype(np.int64) * 3 + self.vote, minlength=len(self.archetypes) * 3,
+        ).reshape(-1, 3)
+        return {name: tuple(int(c) for c in row) for name, row in zip(self.archetypes, counts)}
+
+    def token_usage(self) -> tuple[int, int]:
+        """Total (prompt, prefix-cached prompt) tokens over ballots that report usage."""
+        return (
+            int(self.prompt_tokens[self.prompt_tokens > 0].sum()),
+            int(self.cached_prompt_tokens[self.cached_prompt_tokens > 0].sum()),
+        )